@@ -52,7 +52,9 @@ class ContextManager:
         tasks_collection = get_collection("tasks")
         submissions_collection = get_collection("submissions")
 
-        enrollments = await enrollments_collection.find({"student_uid": user_uid}).to_list(length=None)
+        enrollments = await enrollments_collection.find(
+            {"student_uid": user_uid}, {"subject_id": 1}
+        ).to_list(length=None)
         subject_oids = [e.get("subject_id") for e in enrollments if e.get("subject_id")]
         if not subject_oids:
             return {
@@ -63,8 +65,12 @@ class ContextManager:
                 "updated_at": datetime.utcnow(),
             }
 
-        tasks = await tasks_collection.find({"subject_id": {"$in": subject_oids}}).to_list(length=None)
-        submissions = await submissions_collection.find({"student_uid": user_uid}).to_list(length=None)
+        tasks = await tasks_collection.find(
+            {"subject_id": {"$in": subject_oids}}, {"task_type": 1, "points": 1, "deadline": 1}
+        ).to_list(length=None)
+        submissions = await submissions_collection.find(
+            {"student_uid": user_uid}, {"task_id": 1}
+        ).to_list(length=None)
         submitted_task_ids = {s.get("task_id") for s in submissions if s.get("task_id")}
 
         now = datetime.utcnow()
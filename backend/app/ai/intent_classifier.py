@@ -3,8 +3,9 @@ Intent Classifier for Chat Assistant
 Rule-based intent classification to reduce Groq API calls.
 """
 
+import functools
 import re
-from typing import Tuple, List
+from typing import Dict, FrozenSet, Tuple
 from enum import Enum
 
 
@@ -85,6 +86,20 @@ INTENT_PATTERNS = {
     ]
 }
 
+# Context keys each intent needs, as frozensets for O(1) membership checks
+REQUIRED_CONTEXT: Dict[ChatIntent, FrozenSet[str]] = {
+    ChatIntent.TASK_INFO: frozenset({"tasks", "upcoming_deadlines"}),
+    ChatIntent.SUBMISSION_STATUS: frozenset({"submissions", "pending_evaluations"}),
+    ChatIntent.SCHEDULE_HELP: frozenset({"schedule", "workload"}),
+    ChatIntent.GENERAL_QUERY: frozenset({"tasks", "workload"}),
+    ChatIntent.GREETING: frozenset(),
+    ChatIntent.OUT_OF_SCOPE: frozenset(),
+}
+
+# Short messages ("hi", "show tasks") repeat often, so their classification is
+# memoized. Longer free-form text is classified directly to keep the cache small.
+_CACHEABLE_MESSAGE_LENGTH = 128
+
 
 def classify_intent(message: str) -> Tuple[ChatIntent, float]:
     """
@@ -98,7 +113,18 @@ def classify_intent(message: str) -> Tuple[ChatIntent, float]:
         Confidence score is 0.0 to 1.0
     """
     message_lower = message.lower().strip()
+    if len(message_lower) <= _CACHEABLE_MESSAGE_LENGTH:
+        return _classify_cached(message_lower)
+    return _classify(message_lower)
+
+
+@functools.lru_cache(maxsize=4096)
+def _classify_cached(message_lower: str) -> Tuple[ChatIntent, float]:
+    return _classify(message_lower)
+
 
+def _classify(message_lower: str) -> Tuple[ChatIntent, float]:
+    """Classify an already lowercased and stripped message."""
     # Check for greetings first (highest priority)
     for keyword in INTENT_KEYWORDS[ChatIntent.GREETING]:
         if message_lower == keyword or message_lower.startswith(keyword + " ") or message_lower.startswith(keyword + ","):
@@ -148,7 +174,7 @@ def classify_intent(message: str) -> Tuple[ChatIntent, float]:
     return (best_intent, confidence)
 
 
-def get_required_context(intent: ChatIntent) -> List[str]:
+def get_required_context(intent: ChatIntent) -> FrozenSet[str]:
     """
     Get the context types needed for an intent.
 
@@ -156,18 +182,9 @@ def get_required_context(intent: ChatIntent) -> List[str]:
         intent: The classified intent
 
     Returns:
-        List of context keys to fetch (tasks, submissions, schedule, workload)
+        Set of context keys to fetch (tasks, submissions, schedule, workload)
     """
-    context_map = {
-        ChatIntent.TASK_INFO: ["tasks", "upcoming_deadlines"],
-        ChatIntent.SUBMISSION_STATUS: ["submissions", "pending_evaluations"],
-        ChatIntent.SCHEDULE_HELP: ["schedule", "workload"],
-        ChatIntent.GENERAL_QUERY: ["tasks", "workload"],
-        ChatIntent.GREETING: [],
-        ChatIntent.OUT_OF_SCOPE: []
-    }
-
-    return context_map.get(intent, [])
+    return REQUIRED_CONTEXT.get(intent, frozenset())
 
 
 def get_greeting_response() -> str:
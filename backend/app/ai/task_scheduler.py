@@ -11,6 +11,19 @@ from app.models.task import TaskResponse
 
 logger = logging.getLogger(__name__)
 
+# Fields _serialize_task reads; skips evaluation configs and other wide fields
+_SCHEDULE_TASK_PROJECTION = {
+    "subject_id": 1,
+    "title": 1,
+    "description": 1,
+    "deadline": 1,
+    "points": 1,
+    "task_type": 1,
+    "type": 1,
+    "created_at": 1,
+    "updated_at": 1,
+}
+
 
 class TaskScheduler:
     def __init__(self, context_manager: ContextManager | None = None) -> None:
@@ -24,16 +37,20 @@ class TaskScheduler:
         tasks_collection = get_collection("tasks")
         submissions_collection = get_collection("submissions")
 
-        enrollments = await enrollments_collection.find({"student_uid": user_uid}).to_list(length=None)
+        enrollments = await enrollments_collection.find(
+            {"student_uid": user_uid}, {"subject_id": 1}
+        ).to_list(length=None)
         subject_oids = [e.get("subject_id") for e in enrollments if e.get("subject_id")]
         if not subject_oids:
             return AIScheduleResponse(generated_at=datetime.utcnow(), tasks=[])
 
-        tasks = await tasks_collection.find({"subject_id": {"$in": subject_oids}}).to_list(length=None)
+        tasks = await tasks_collection.find(
+            {"subject_id": {"$in": subject_oids}}, _SCHEDULE_TASK_PROJECTION
+        ).to_list(length=None)
         submitted_task_ids: set[Any] = set()
 
         individual_submissions = await submissions_collection.find(
-            {"student_uid": user_uid, "group_id": None}
+            {"student_uid": user_uid, "group_id": None}, {"task_id": 1}
         ).to_list(length=None)
         submitted_task_ids.update({s.get("task_id") for s in individual_submissions if s.get("task_id")})
 
@@ -41,12 +58,12 @@ class TaskScheduler:
         if group_task_ids:
             groups_collection = get_collection("groups")
             groups = await groups_collection.find(
-                {"task_id": {"$in": group_task_ids}, "member_uids": user_uid}
+                {"task_id": {"$in": group_task_ids}, "member_uids": user_uid}, {"_id": 1}
             ).to_list(length=None)
             group_ids = [g.get("_id") for g in groups if g.get("_id")]
             if group_ids:
                 group_submissions = await submissions_collection.find(
-                    {"group_id": {"$in": group_ids}}
+                    {"group_id": {"$in": group_ids}}, {"task_id": 1}
                 ).to_list(length=None)
                 submitted_task_ids.update(
                     {s.get("task_id") for s in group_submissions if s.get("task_id")}
@@ -154,7 +171,8 @@ class TaskScheduler:
         return "low"
 
     def _serialize_task(self, doc: dict) -> TaskResponse:
-        return TaskResponse(
+        # Trusted Mongo read with only flat fields; skip per-field validation
+        return TaskResponse.model_construct(
             id=str(doc["_id"]),
             subject_id=str(doc["subject_id"]),
             title=doc.get("title") or "",
@@ -206,7 +224,7 @@ class TaskScheduler:
             subjects_collection = get_collection("subjects")
             subject_ids = list(set(t.task.subject_id for t in schedule.tasks[:10]))
             subjects = await subjects_collection.find(
-                {"_id": {"$in": [self._to_object_id(sid) for sid in subject_ids]}}
+                {"_id": {"$in": [self._to_object_id(sid) for sid in subject_ids]}}, {"name": 1}
             ).to_list(length=None)
             subject_names = {str(s["_id"]): s.get("name", "Unknown") for s in subjects}
 
@@ -8,6 +8,8 @@ Provides endpoints for:
 """
 
 import logging
+from datetime import datetime, timezone
+
 from fastapi import APIRouter, Depends, Response, HTTPException, status
 
 from app.ai.context_manager import ContextManager
@@ -122,6 +124,15 @@ async def send_chat_message(
         )
 
         # Check for error codes
+        if result.get("error") == "EMPTY_MESSAGE":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "error": result["response"],
+                    "error_code": "EMPTY_MESSAGE",
+                },
+            )
+
         if result.get("error") == "NO_CREDITS":
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -174,12 +185,14 @@ async def get_chat_history(
 
     history = chat_service.get_history(user_uid)
 
+    # One timestamp for any entries missing their own, instead of a clock read per message
+    now = datetime.now(timezone.utc)
     messages = [
         ChatMessage(
             role=msg["role"],
             content=msg["content"],
             intent=msg.get("intent"),
-            timestamp=msg.get("timestamp")
+            timestamp=msg.get("timestamp") or now
         )
         for msg in history
     ]
@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import APIRouter, HTTPException, status, Depends, Query, File, UploadFile
 from datetime import datetime
 from pymongo.errors import DuplicateKeyError
@@ -14,12 +16,29 @@ from app.models.user import (
 from app.utils.firebase_verify import verify_firebase_token, get_firebase_user
 from app.utils.dependencies import get_current_user, get_current_teacher
 from app.database.collections import get_collection
+from app.database.connection import get_database
 from app.config import settings
+from app.services.credit_service import get_credit_service
 from app.services.profile_pictures import delete_profile_picture, upsert_profile_picture
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Strong references to fire-and-forget tasks so they are not collected mid-run
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _warm_chat_credits(uid: str, role: Optional[str]) -> None:
+    """Prefetch the user's AI credit record so their first chat message skips the lookup."""
+    try:
+        credit_service = get_credit_service(get_database())
+    except RuntimeError as e:
+        logger.warning(f"Skipping credit warm-up for user {uid}: {e}")
+        return
+    task = asyncio.create_task(credit_service.warm(uid, role or "student"))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
 
 class UserUpdateRequest(BaseModel):
     """Request model for updating user profile"""
@@ -197,6 +216,7 @@ async def login(request: LoginRequest):
             )
 
         logger.info(f"User logged in: uid={uid}, role={user.get('role')}")
+        _warm_chat_credits(uid, user.get("role"))
         return UserResponse(**user)
 
     except HTTPException:
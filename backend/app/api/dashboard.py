@@ -297,10 +297,20 @@ async def teacher_pending(
         return TeacherPendingSummaryResponse(generated_at=now, pending_submissions=0, total_submissions=0)
 
     submissions_collection = get_collection("submissions")
-    total = await submissions_collection.count_documents({"subject_id": {"$in": subject_oids}})
-    pending = await submissions_collection.count_documents(
-        {"subject_id": {"$in": subject_oids}, "score": None}
-    )
+    pipeline = [
+        {"$match": {"subject_id": {"$in": subject_oids}}},
+        {
+            "$facet": {
+                "total": [{"$count": "n"}],
+                "pending": [{"$match": {"score": None}}, {"$count": "n"}],
+            }
+        },
+    ]
+    cursor = await submissions_collection.aggregate(pipeline)
+    rows = await cursor.to_list(length=1)
+    facets = rows[0] if rows else {}
+    total = (facets.get("total") or [{}])[0].get("n", 0)
+    pending = (facets.get("pending") or [{}])[0].get("n", 0)
 
     return TeacherPendingSummaryResponse(
         generated_at=now,
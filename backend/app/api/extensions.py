@@ -3,6 +3,7 @@ Extension Request API
 Handles deadline extension requests from students with AI analysis
 """
 
+from bson import ObjectId
 from fastapi import APIRouter, HTTPException, Depends
 from typing import Optional
 
@@ -133,7 +134,7 @@ async def get_extension_request(
     elif current_user["role"] == "teacher":
         # Verify teacher owns the subject (checked in service layer, but double-check)
         db = get_db()
-        task = await db.tasks.find_one({"_id": extension.task_id})
+        task = await db.tasks.find_one({"_id": ObjectId(extension.task_id)})
         subject = await db.subjects.find_one({"_id": task["subject_id"]}) if task else None
         if not subject or subject["teacher_uid"] != current_user["uid"]:
             raise HTTPException(status_code=403, detail="Not authorized to view this extension")
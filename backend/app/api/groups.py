@@ -24,7 +24,7 @@ def _join_submissions_by_group_id(groups: list[dict], submissions: list[dict]) -
     results: list[GroupResponse] = []
     for g in groups:
         submission = by_group_id.get(g["_id"])
-        results.append(GroupResponse(**serialize_group(g, submission=submission)))
+        results.append(GroupResponse.model_construct(**serialize_group(g, submission=submission)))
     return results
 
 
@@ -44,7 +44,7 @@ async def create_groups_for_task(
         group_settings=group_set.get("group_settings"),
         problem_statements=list(group_set.get("problem_statements") or []),
         has_submissions=has_submissions,
-        groups=[GroupResponse(**serialize_group(g)) for g in groups],
+        groups=[GroupResponse.model_construct(**serialize_group(g)) for g in groups],
     )
 
 
@@ -65,7 +65,7 @@ async def list_groups(
             {"task_id": group_set["task_id"], "group_id": {"$in": group_ids}}
         ).to_list(length=None)
 
-    serialized = _join_submissions_by_group_id(groups, submissions) if submissions else [GroupResponse(**serialize_group(g)) for g in groups]
+    serialized = _join_submissions_by_group_id(groups, submissions) if submissions else [GroupResponse.model_construct(**serialize_group(g)) for g in groups]
     return GroupListResponse(
         task_id=str(group_set["task_id"]),
         group_set_id=str(group_set["_id"]),
@@ -82,7 +82,7 @@ async def get_my_group(
     current_student: dict = Depends(get_current_student),
 ):
     group = await get_student_group_for_task(task_id=task_id, student_uid=current_student["uid"])
-    return GroupResponse(**serialize_group(group))
+    return GroupResponse.model_construct(**serialize_group(group))
 
 
 @router.get("/health")
@@ -17,6 +17,7 @@ from app.models.submission import (
 )
 from app.models.task import QuizQuestion
 from app.services.groq_service import groq_service
+from app.services.submission_service import serialize_submission
 from app.utils.dependencies import get_current_student, get_current_teacher
 
 router = APIRouter()
@@ -48,41 +49,6 @@ async def _ensure_student_enrolled(student_uid: str, subject_oid: ObjectId) -> N
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
 
-def _serialize_submission(doc: dict) -> SubmissionResponse:
-    """Helper to serialize submission document"""
-    raw_attachments = doc.get("attachments") or []
-    from app.models.submission import SubmissionAttachmentResponse
-
-    attachments = []
-    for a in raw_attachments:
-        if not isinstance(a, dict):
-            continue
-        attachments.append(
-            SubmissionAttachmentResponse(
-                id=str(a.get("id")),
-                filename=str(a.get("filename") or ""),
-                content_type=str(a.get("content_type") or "application/octet-stream"),
-                size=int(a.get("size") or 0),
-                uploaded_at=a.get("uploaded_at") or doc.get("updated_at") or doc.get("created_at"),
-            )
-        )
-    return SubmissionResponse(
-        id=str(doc["_id"]),
-        task_id=str(doc["task_id"]),
-        subject_id=str(doc["subject_id"]),
-        student_uid=doc["student_uid"],
-        group_id=str(doc["group_id"]) if doc.get("group_id") is not None else None,
-        content=doc["content"],
-        submitted_at=doc["submitted_at"],
-        created_at=doc["created_at"],
-        updated_at=doc["updated_at"],
-        score=doc.get("score"),
-        feedback=doc.get("feedback"),
-        attachments=attachments,
-        evaluation=SubmissionEvaluation.model_validate(doc.get("evaluation")) if doc.get("evaluation") else None,
-    )
-
-
 @router.post("/generate", response_model=list[QuizQuestion])
 async def generate_quiz_questions(
     request: QuizGenerateRequest,
@@ -397,7 +363,7 @@ async def submit_quiz(
         # TODO: Send notification to teacher
         pass
 
-    return _serialize_submission(updated)
+    return serialize_submission(updated)
 
 
 @router.post("/malpractice", response_model=dict)
@@ -16,6 +16,7 @@ from app.models.subject import (
     SubjectUpdateRequest,
 )
 from app.models.roster import StudentRosterItem
+from app.services.extension_service import invalidate_teacher_subjects
 from app.utils.dependencies import get_current_student, get_current_teacher, get_current_user
 
 router = APIRouter()
@@ -94,6 +95,7 @@ async def create_subject(
         }
 
         result = await subjects_collection.insert_one(subject_doc)
+        invalidate_teacher_subjects(current_teacher["uid"])
         logger.info(f"Subject created: id={result.inserted_id}, name={request.name}, teacher={current_teacher['uid']}, join_code={join_code}")
 
         created = await subjects_collection.find_one({"_id": result.inserted_id})
@@ -132,12 +134,13 @@ async def list_subjects(current_user: dict = Depends(get_current_user)):
         task_counts: dict[ObjectId, int] = {}
         if subject_oids:
             enrollments_collection = get_collection("enrollments")
-            enrollment_agg = await enrollments_collection.aggregate(
+            enrollment_cursor = await enrollments_collection.aggregate(
                 [
                     {"$match": {"subject_id": {"$in": subject_oids}}},
                     {"$group": {"_id": "$subject_id", "count": {"$sum": 1}}},
                 ]
-            ).to_list(length=None)
+            )
+            enrollment_agg = await enrollment_cursor.to_list(length=None)
             for row in enrollment_agg:
                 if not isinstance(row, dict):
                     continue
@@ -146,12 +149,13 @@ async def list_subjects(current_user: dict = Depends(get_current_user)):
                     student_counts[sid] = int(row.get("count") or 0)
 
             tasks_collection = get_collection("tasks")
-            task_agg = await tasks_collection.aggregate(
+            task_cursor = await tasks_collection.aggregate(
                 [
                     {"$match": {"subject_id": {"$in": subject_oids}}},
                     {"$group": {"_id": "$subject_id", "count": {"$sum": 1}}},
                 ]
-            ).to_list(length=None)
+            )
+            task_agg = await task_cursor.to_list(length=None)
             for row in task_agg:
                 if not isinstance(row, dict):
                     continue
@@ -302,6 +306,7 @@ async def delete_subject(subject_id: str, current_teacher: dict = Depends(get_cu
 
     subjects_collection = get_collection("subjects")
     await subjects_collection.delete_one({"_id": subject["_id"]})
+    invalidate_teacher_subjects(current_teacher["uid"])
 
 
 @router.get("/health")
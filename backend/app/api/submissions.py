@@ -13,13 +13,12 @@ from app.models.submission import (
     BatchEvaluateRequest,
     BatchEvaluateResponse,
     EvaluationProgressResponse,
-    SubmissionAttachmentResponse,
     SubmissionGradeRequest,
     SubmissionEvaluation,
     SubmissionResponse,
     SubmissionUpsertRequest,
 )
-from app.services.submission_service import queue_evaluation
+from app.services.submission_service import queue_evaluation, serialize_submission
 from app.utils.dependencies import get_current_student, get_current_teacher, get_current_user
 
 router = APIRouter()
@@ -38,38 +37,6 @@ _ALLOWED_CONTENT_TYPES = {
 }
 
 
-def _serialize_submission(doc: dict) -> SubmissionResponse:
-    raw_attachments = doc.get("attachments") or []
-    attachments: list[SubmissionAttachmentResponse] = []
-    for a in raw_attachments:
-        if not isinstance(a, dict):
-            continue
-        attachments.append(
-            SubmissionAttachmentResponse(
-                id=str(a.get("id")),
-                filename=str(a.get("filename") or ""),
-                content_type=str(a.get("content_type") or "application/octet-stream"),
-                size=int(a.get("size") or 0),
-                uploaded_at=a.get("uploaded_at") or doc.get("updated_at") or doc.get("created_at"),
-            )
-        )
-    return SubmissionResponse(
-        id=str(doc["_id"]),
-        task_id=str(doc["task_id"]),
-        subject_id=str(doc["subject_id"]),
-        student_uid=doc["student_uid"],
-        group_id=str(doc["group_id"]) if doc.get("group_id") is not None else None,
-        content=doc["content"],
-        submitted_at=doc["submitted_at"],
-        created_at=doc["created_at"],
-        updated_at=doc["updated_at"],
-        score=doc.get("score"),
-        feedback=doc.get("feedback"),
-        attachments=attachments,
-        evaluation=SubmissionEvaluation.model_validate(doc.get("evaluation")) if doc.get("evaluation") else None,
-    )
-
-
 async def _find_task_or_404(task_oid: ObjectId) -> dict:
     tasks_collection = get_collection("tasks")
     task = await tasks_collection.find_one({"_id": task_oid})
@@ -187,7 +154,7 @@ async def upsert_submission(
     if existing:
         await submissions_collection.update_one({"_id": existing["_id"]}, {"$set": doc})
         updated = await submissions_collection.find_one({"_id": existing["_id"]})
-        return _serialize_submission(updated)
+        return serialize_submission(updated)
 
     doc["created_at"] = now
     doc["score"] = None
@@ -205,11 +172,11 @@ async def upsert_submission(
         if existing:
             await submissions_collection.update_one({"_id": existing["_id"]}, {"$set": doc})
             updated = await submissions_collection.find_one({"_id": existing["_id"]})
-            return _serialize_submission(updated)
+            return serialize_submission(updated)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Submit failed")
 
     created = await submissions_collection.find_one({"_id": result.inserted_id})
-    return _serialize_submission(created)
+    return serialize_submission(created)
 
 
 @router.get("/me", response_model=SubmissionResponse)
@@ -243,7 +210,7 @@ async def get_my_submission(
         )
     if not submission:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Submission not found")
-    return _serialize_submission(submission)
+    return serialize_submission(submission)
 
 
 @router.get("/mine", response_model=list[SubmissionResponse])
@@ -287,7 +254,7 @@ async def list_my_submissions(
             submissions.extend(group_submissions)
 
     submissions.sort(key=lambda s: (s.get("submitted_at") or datetime.min), reverse=True)
-    return [_serialize_submission(s) for s in submissions]
+    return [serialize_submission(s) for s in submissions]
 
 
 @router.post("/{submission_id}/attachments", response_model=SubmissionResponse)
@@ -356,7 +323,7 @@ async def upload_attachments(
         },
     )
     updated = await submissions_collection.find_one({"_id": submission_oid})
-    return _serialize_submission(updated)
+    return serialize_submission(updated)
 
 
 @router.get("/{submission_id}/attachments/{attachment_id}")
@@ -451,7 +418,7 @@ async def delete_attachment(
         {"$pull": {"attachments": {"id": attachment_id}}, "$set": {"updated_at": now}},
     )
     updated = await submissions_collection.find_one({"_id": submission_oid})
-    return _serialize_submission(updated)
+    return serialize_submission(updated)
 
 
 @router.get("", response_model=list[SubmissionResponse])
@@ -472,7 +439,7 @@ async def list_submissions(
         .sort([("submitted_at", -1), ("_id", -1)])
         .to_list(length=None)
     )
-    return [_serialize_submission(s) for s in submissions]
+    return [serialize_submission(s) for s in submissions]
 
 
 @router.post("/{submission_id}/evaluate", response_model=SubmissionResponse)
@@ -492,7 +459,7 @@ async def evaluate_submission(
     updated = await queue_evaluation(submission_id=submission_oid)
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Submission not found")
-    return _serialize_submission(updated)
+    return serialize_submission(updated)
 
 
 @router.get("/{submission_id}/evaluation", response_model=SubmissionEvaluation)
@@ -637,7 +604,7 @@ async def grade_submission(
 
     await submissions_collection.update_one({"_id": submission["_id"]}, {"$set": update})
     updated = await submissions_collection.find_one({"_id": submission["_id"]})
-    return _serialize_submission(updated)
+    return serialize_submission(updated)
 
 
 @router.get("/health")
@@ -236,38 +236,36 @@ async def get_evaluations_summary(
     await _ensure_teacher_owns_subject(current_teacher["uid"], subject_oid)
 
     submissions_collection = get_collection("submissions")
+    # One $group pass yields per-status counts plus the pieces of the AI score
+    # average; totals are folded from the (few) status rows here.
     pipeline = [
         {"$match": {"task_id": task["_id"]}},
         {
-            "$project": {
-                "status": {"$ifNull": ["$evaluation.status", "pending"]},
-                "ai_score": "$evaluation.ai_score",
-            }
-        },
-        {
-            "$facet": {
-                "counts": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
-                "summary": [{"$group": {"_id": None, "total": {"$sum": 1}, "avg": {"$avg": "$ai_score"}}}],
+            "$group": {
+                "_id": {"$ifNull": ["$evaluation.status", "pending"]},
+                "count": {"$sum": 1},
+                "ai_sum": {"$sum": "$evaluation.ai_score"},
+                "ai_n": {"$sum": {"$cond": [{"$isNumber": "$evaluation.ai_score"}, 1, 0]}},
             }
         },
     ]
 
-    agg = await submissions_collection.aggregate(pipeline).to_list(length=1)
-    doc = agg[0] if agg else {}
-    counts = doc.get("counts") if isinstance(doc.get("counts"), list) else []
-    summary = doc.get("summary") if isinstance(doc.get("summary"), list) else []
-    summary_doc = summary[0] if summary else {}
+    cursor = await submissions_collection.aggregate(pipeline)
+    rows = await cursor.to_list(length=None)
 
     status_counts: dict[str, int] = {}
-    for row in counts:
+    ai_sum = 0.0
+    ai_n = 0
+    for row in rows:
         if not isinstance(row, dict):
             continue
         key = str(row.get("_id") or "pending")
-        status_counts[key] = int(row.get("count") or 0)
+        status_counts[key] = status_counts.get(key, 0) + int(row.get("count") or 0)
+        ai_sum += float(row.get("ai_sum") or 0)
+        ai_n += int(row.get("ai_n") or 0)
 
-    total = int(summary_doc.get("total") or sum(status_counts.values()))
-    avg = summary_doc.get("avg")
-    average_ai_score = float(avg) if isinstance(avg, (int, float)) else None
+    total = sum(status_counts.values())
+    average_ai_score = ai_sum / ai_n if ai_n else None
     return TaskEvaluationsSummaryResponse(
         task_id=task_id,
         total_submissions=total,
@@ -47,6 +47,7 @@ class Settings(BaseSettings):
     groq_student_weight: int = Field(default=1, alias="GROQ_STUDENT_WEIGHT")
     groq_teacher_count: int = Field(default=40, alias="GROQ_TEACHER_COUNT")
     groq_student_count: int = Field(default=100, alias="GROQ_STUDENT_COUNT")
+    groq_max_concurrency: int = Field(default=8, alias="GROQ_MAX_CONCURRENCY")
 
     # Redis Configuration (for Groq caching)
     redis_url: Optional[str] = Field(default=None, alias="REDIS_URL")
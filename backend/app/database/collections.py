@@ -1,7 +1,7 @@
-from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.asynchronous.collection import AsyncCollection
 
 from app.database.connection import get_db
 
 
-def get_collection(name: str) -> AsyncIOMotorCollection:
+def get_collection(name: str) -> AsyncCollection:
     return get_db()[name]
@@ -1,24 +1,24 @@
 from __future__ import annotations
 
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from pymongo import ASCENDING
+from pymongo import ASCENDING, DESCENDING, AsyncMongoClient
+from pymongo.asynchronous.database import AsyncDatabase
 
 from app.config import settings
 
-_client: AsyncIOMotorClient | None = None
+_client: AsyncMongoClient | None = None
 
 
-def get_client() -> AsyncIOMotorClient:
+def get_client() -> AsyncMongoClient:
     if _client is None:
         raise RuntimeError("MongoDB client is not initialized")
     return _client
 
 
-def get_db() -> AsyncIOMotorDatabase:
+def get_db() -> AsyncDatabase:
     return get_client()[settings.mongodb_db_name]
 
 
-def get_database() -> AsyncIOMotorDatabase:
+def get_database() -> AsyncDatabase:
     return get_db()
 
 
@@ -27,7 +27,7 @@ async def connect_to_mongo() -> None:
     if _client is not None:
         return
 
-    _client = AsyncIOMotorClient(
+    _client = AsyncMongoClient(
         settings.mongodb_url,
         serverSelectionTimeoutMS=settings.mongodb_server_selection_timeout_ms,
         connectTimeoutMS=settings.mongodb_server_selection_timeout_ms,
@@ -42,7 +42,7 @@ async def close_mongo_connection() -> None:
     if _client is None:
         return
 
-    _client.close()
+    await _client.close()
     _client = None
 
 
@@ -67,6 +67,11 @@ async def ensure_mongo_indexes() -> None:
         await submissions_collection.drop_index("uniq_submissions_task_student_individual")
     except Exception:
         pass
+    try:
+        # Superseded by idx_extensions_subject_status_created
+        await extensions_collection.drop_index("idx_extensions_subject_status")
+    except Exception:
+        pass
 
     pipeline = [
         {"$match": {"uid": {"$exists": True, "$ne": None}}},
@@ -74,7 +79,7 @@ async def ensure_mongo_indexes() -> None:
         {"$match": {"count": {"$gt": 1}}},
     ]
 
-    async for dup in users_collection.aggregate(pipeline):
+    async for dup in await users_collection.aggregate(pipeline):
         uid = dup.get("_id")
         if not uid:
             continue
@@ -91,6 +96,33 @@ async def ensure_mongo_indexes() -> None:
         delete_ids = [doc["_id"] for doc in docs[1:]]
         await users_collection.delete_many({"_id": {"$in": delete_ids}})
 
+    # Extensions used to store task_id as a hex string; convert to ObjectId
+    await extensions_collection.update_many(
+        {"task_id": {"$type": "string"}},
+        [{"$set": {"task_id": {"$convert": {"input": "$task_id", "to": "objectId", "onError": "$task_id"}}}}],
+    )
+
+    # uniq_extensions_pending_student_task can't build while a student has
+    # several pending requests for one task; keep the newest, drop the rest
+    pending_pipeline = [
+        {"$match": {"status": "pending"}},
+        {"$group": {"_id": {"student_uid": "$student_uid", "task_id": "$task_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+
+    async for dup in await extensions_collection.aggregate(pending_pipeline):
+        docs = await (
+            extensions_collection.find({**dup["_id"], "status": "pending"}, {"_id": 1})
+            .sort([("created_at", -1), ("_id", -1)])
+            .to_list(length=None)
+        )
+
+        if len(docs) <= 1:
+            continue
+
+        delete_ids = [doc["_id"] for doc in docs[1:]]
+        await extensions_collection.delete_many({"_id": {"$in": delete_ids}, "status": "pending"})
+
     await users_collection.create_index([("uid", ASCENDING)], unique=True, name="uniq_users_uid")
     await subjects_collection.create_index(
         [("join_code", ASCENDING)], unique=True, name="uniq_subjects_join_code"
@@ -140,6 +172,14 @@ async def ensure_mongo_indexes() -> None:
         [("student_uid", ASCENDING), ("submitted_at", ASCENDING)],
         name="idx_submissions_student_submitted_at",
     )
+    await submissions_collection.create_index(
+        [("task_id", ASCENDING), ("score", ASCENDING)],
+        name="idx_submissions_task_score",
+    )
+    await submissions_collection.create_index(
+        [("student_uid", ASCENDING), ("task_id", ASCENDING)],
+        name="idx_submissions_student_task",
+    )
     await user_context_collection.create_index(
         [("user_uid", ASCENDING)],
         unique=True,
@@ -202,6 +242,11 @@ async def ensure_mongo_indexes() -> None:
         [("last_reset", ASCENDING)],
         name="idx_ai_credits_last_reset",
     )
+    await ai_credits_collection.create_index(
+        [("resets_at", ASCENDING)],
+        expireAfterSeconds=0,
+        name="ttl_ai_credits_resets_at",
+    )
 
     # Extensions collection indexes
     await extensions_collection.create_index(
@@ -213,10 +258,20 @@ async def ensure_mongo_indexes() -> None:
         name="idx_extensions_task",
     )
     await extensions_collection.create_index(
-        [("subject_id", ASCENDING), ("status", ASCENDING)],
-        name="idx_extensions_subject_status",
+        [("subject_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)],
+        name="idx_extensions_subject_status_created",
+    )
+    await extensions_collection.create_index(
+        [("subject_id", ASCENDING), ("created_at", DESCENDING)],
+        name="idx_extensions_subject_created",
     )
     await extensions_collection.create_index(
         [("status", ASCENDING), ("created_at", ASCENDING)],
         name="idx_extensions_status_created",
     )
+    await extensions_collection.create_index(
+        [("student_uid", ASCENDING), ("task_id", ASCENDING)],
+        unique=True,
+        name="uniq_extensions_pending_student_task",
+        partialFilterExpression={"status": "pending"},
+    )
@@ -1,7 +1,9 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 
@@ -11,30 +13,37 @@ from app.database.connection import close_mongo_connection, connect_to_mongo, en
 from app.utils.firebase_verify import initialize_firebase
 
 
-def _parse_origins(value: str) -> list[str]:
-    return [origin.strip() for origin in value.split(",") if origin.strip()]
+def _parse_origins(value: str) -> tuple[str, ...]:
+    return tuple(origin.strip() for origin in value.split(",") if origin.strip())
+
+
+_ORIGINS = _parse_origins(settings.allowed_origins)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Initialize Firebase Admin SDK
-    initialize_firebase()
-    # Connect to MongoDB
-    await connect_to_mongo()
+    # Firebase Admin SDK init is sync and independent of MongoDB, so run it in a
+    # worker thread while the Mongo client connects.
+    await asyncio.gather(asyncio.to_thread(initialize_firebase), connect_to_mongo())
     await ensure_mongo_indexes()
     yield
     # Cleanup
     await close_mongo_connection()
 
 
-app = FastAPI(title=settings.app_name, debug=settings.debug, lifespan=lifespan)
+app = FastAPI(
+    title=settings.app_name,
+    debug=settings.debug,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 Path(settings.uploads_dir).mkdir(parents=True, exist_ok=True)
 app.mount("/uploads", StaticFiles(directory=settings.uploads_dir), name="uploads")
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=_parse_origins(settings.allowed_origins),
+    allow_origins=_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -5,7 +5,9 @@ Pydantic models for the chat assistant and credit system.
 
 from datetime import datetime, timezone
 from typing import Optional, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from app.utils.validators import reject_oversized
 
 
 def _utcnow() -> datetime:
@@ -57,6 +59,11 @@ class ChatRequest(BaseModel):
         description="User's chat message"
     )
 
+    @field_validator("message", mode="before")
+    @classmethod
+    def _check_message_length(cls, v):
+        return reject_oversized(v, 500)
+
 
 class ChatResponse(BaseModel):
     """Response model for chat messages"""
@@ -72,6 +79,8 @@ class ChatResponse(BaseModel):
         description="Response timestamp"
     )
 
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
 
 class ChatMessage(BaseModel):
     """Model for a single chat message (for history)"""
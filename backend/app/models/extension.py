@@ -5,7 +5,10 @@ Handles deadline extension requests from students with AI workload analysis
 
 from datetime import datetime
 from typing import Optional, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from app.utils.helpers import ensure_utc
+from app.utils.validators import reject_oversized
 
 
 class ExtensionAIAnalysis(BaseModel):
@@ -26,9 +29,23 @@ class ExtensionRequestCreate(BaseModel):
     requested_deadline: datetime = Field(..., description="Requested new deadline")
     reason: str = Field(..., min_length=10, max_length=1000, description="Reason for extension request")
 
+    @field_validator("reason", mode="before")
+    @classmethod
+    def _check_reason_length(cls, v):
+        return reject_oversized(v, 1000)
+
+    @field_validator("requested_deadline")
+    @classmethod
+    def _requested_deadline_utc(cls, v: datetime) -> datetime:
+        return ensure_utc(v)
+
 
 class ExtensionRequestResponse(BaseModel):
-    """Extension request response model"""
+    """Extension request response model.
+
+    Fields are filled from trusted Mongo documents, so callers may use
+    ``ExtensionRequestResponse.model_construct(...)`` to skip re-validation.
+    """
 
     id: str = Field(..., description="Extension request ID")
     student_uid: str = Field(..., description="Student UID who requested")
@@ -49,6 +66,8 @@ class ExtensionRequestResponse(BaseModel):
     updated_at: datetime = Field(..., description="Last update timestamp")
     reviewed_at: Optional[datetime] = Field(None, description="Review timestamp")
 
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
 
 class ExtensionRequestList(BaseModel):
     """List of extension requests with pagination"""
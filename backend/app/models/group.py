@@ -10,6 +10,12 @@ class GroupCreateRequest(BaseModel):
 
 
 class GroupResponse(BaseModel):
+    """Group as returned by the API.
+
+    ``serialize_group`` already produces the right types, so build with
+    ``GroupResponse.model_construct(**serialize_group(doc))``.
+    """
+
     id: str
     task_id: str
     subject_id: str
@@ -1,7 +1,9 @@
 from datetime import datetime
 from typing import Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from app.utils.validators import reject_oversized
 
 
 EvaluationStatus = Literal["pending", "running", "completed", "failed"]
@@ -105,13 +107,30 @@ class SubmissionUpsertRequest(BaseModel):
     content: str = Field(default="", max_length=10000)
     group_id: Optional[str] = None
 
+    @field_validator("content", mode="before")
+    @classmethod
+    def _check_content_length(cls, v):
+        return reject_oversized(v, 10000)
+
 
 class SubmissionGradeRequest(BaseModel):
     score: Optional[float] = Field(default=None, ge=0)
     feedback: Optional[str] = Field(default=None, max_length=10000)
 
+    @field_validator("feedback", mode="before")
+    @classmethod
+    def _check_feedback_length(cls, v):
+        return reject_oversized(v, 10000)
+
 
 class SubmissionResponse(BaseModel):
+    """Submission as returned by the API.
+
+    Built from trusted Mongo documents, so serializers should use
+    ``SubmissionResponse.model_construct(...)`` rather than the validating
+    constructor; FastAPI still validates against the response model.
+    """
+
     id: str
     task_id: str
     subject_id: str
@@ -126,6 +145,8 @@ class SubmissionResponse(BaseModel):
     attachments: list[SubmissionAttachmentResponse] = Field(default_factory=list)
     evaluation: Optional[SubmissionEvaluation] = None
 
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
 
 class QuizSubmitRequest(BaseModel):
     task_id: str
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 TaskKind = Literal["individual", "group"]
@@ -95,6 +95,12 @@ class TaskUpdateRequest(BaseModel):
 
 
 class TaskResponse(BaseModel):
+    """Task as returned by the API.
+
+    Prefer ``TaskResponse.model_construct(...)`` when building from trusted
+    Mongo documents whose nested configs are already model instances.
+    """
+
     id: str
     subject_id: str
     title: str
@@ -109,9 +115,13 @@ class TaskResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+    model_config = ConfigDict(extra="ignore", frozen=True, defer_build=True)
+
 
 class TaskEvaluationsSummaryResponse(BaseModel):
     task_id: str
     total_submissions: int
     status_counts: dict[str, int] = Field(default_factory=dict)
     average_ai_score: float | None = None
+
+    model_config = ConfigDict(extra="ignore", defer_build=True)
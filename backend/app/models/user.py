@@ -32,7 +32,7 @@ class UserResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(extra="ignore", defer_build=True, from_attributes=True)
 
 
 class TokenData(BaseModel):
@@ -4,31 +4,67 @@ Handles the chat assistant functionality with intent classification,
 context gathering, and Groq integration.
 """
 
+import asyncio
 import logging
+import threading
+import time
+from collections import OrderedDict, deque
 from datetime import datetime, timezone
-from typing import Optional, Dict, List, Any
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from itertools import islice
+from typing import Optional, Deque, Dict, List, Any, NamedTuple, Tuple
+from pymongo.asynchronous.database import AsyncDatabase
 
+from app.ai.context_manager import ContextManager
 from app.ai.intent_classifier import (
     ChatIntent,
     classify_intent,
     get_required_context,
     get_greeting_response,
+    get_out_of_scope_response,
 )
+from app.ai.task_scheduler import TaskScheduler
 from app.services.groq_service import groq_service, RateLimitExceeded, GroqServiceError
 from app.services.credit_service import CreditService
 from app.database.collections import get_collection
 
 logger = logging.getLogger(__name__)
 
+_HISTORY_MAX_MESSAGES = 20
+_HISTORY_MAX_SESSIONS = 10_000
+# Upper bounds on teacher-side fan-out reads so one oversized account cannot
+# pull an unbounded number of documents into memory.
+_MAX_TEACHER_SUBJECTS = 200
+_MAX_TEACHER_TASKS = 2000
+_LLM_HISTORY_MESSAGES = 10
+# Ungraded-submission counts are cached briefly per teacher; the count is
+# the heaviest read in the teacher chat path and changes only on submit/grade.
+_UNGRADED_CACHE_TTL_SECONDS = 60
+_UNGRADED_CACHE_MAX_TEACHERS = 10_000
+
+
+class _HistoryEntry(NamedTuple):
+    """One stored chat message; a tuple is far smaller than a per-message dict."""
+    role: str
+    content: str
+    intent: Optional[str]
+    timestamp: datetime
+
 
 class ChatService:
     """Service for handling chat assistant interactions"""
 
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncDatabase, max_sessions: int = _HISTORY_MAX_SESSIONS):
         self.db = db
         self.credit_service = CreditService(db)
-        self._history: Dict[str, List[Dict]] = {}  # In-memory history (per session)
+        # Both are stateless between calls, so one instance serves every request
+        self._context_manager = ContextManager()
+        self._scheduler = TaskScheduler(context_manager=self._context_manager)
+        # In-memory history (per session), evicted least-recently-used first
+        self._history: OrderedDict[str, Deque[_HistoryEntry]] = OrderedDict()
+        self._max_sessions = max_sessions
+        # teacher_uid -> (expires_at monotonic seconds, ungraded count), oldest
+        # write first; every entry shares one TTL, so that is also expiry order
+        self._ungraded_cache: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
 
     async def process_message(
         self,
@@ -47,12 +83,31 @@ class ChatService:
         Returns:
             Dict with response, intent, context_used, credits_remaining
         """
+        # One clock read serves every early return and the credit lookup; only
+        # a completed turn re-reads it after the Groq round trip.
+        received_at = datetime.now(timezone.utc)
+
+        # Whitespace-only input (double-sends, UI noise) never reaches the
+        # classifier, the credit store or Groq.
+        message = message.strip()
+        if not message:
+            return {
+                "response": "Please type a message.",
+                "intent": "empty",
+                "context_used": [],
+                "credits_remaining": None,
+                "error": "EMPTY_MESSAGE",
+                "timestamp": received_at,
+            }
+
         # Classify intent
         intent, confidence = classify_intent(message)
         logger.debug(f"Classified intent: {intent} (confidence: {confidence})")
 
         normalized_role = str(role or "student").lower()
-        credit_status = await self.credit_service.get_credits(user_uid, normalized_role)
+        credit_status = await self.credit_service.get_credits(
+            user_uid, normalized_role, now=received_at.replace(tzinfo=None)
+        )
 
         # Handle special intents without Groq
         if intent == ChatIntent.GREETING:
@@ -61,7 +116,18 @@ class ChatService:
                 "intent": intent.value,
                 "context_used": [],
                 "credits_remaining": credit_status["credits_remaining"],
-                "timestamp": datetime.now(timezone.utc)
+                "timestamp": received_at
+            }
+
+        # Out-of-scope questions get the canned redirect; no context, no Groq
+        # round trip and no credit spent
+        if intent == ChatIntent.OUT_OF_SCOPE:
+            return {
+                "response": get_out_of_scope_response(),
+                "intent": intent.value,
+                "context_used": [],
+                "credits_remaining": credit_status["credits_remaining"],
+                "timestamp": received_at
             }
 
         if credit_status["credits_remaining"] <= 0:
@@ -71,7 +137,7 @@ class ChatService:
                 "context_used": [],
                 "credits_remaining": 0,
                 "error": "NO_CREDITS",
-                "timestamp": datetime.now(timezone.utc),
+                "timestamp": received_at,
             }
 
         if not groq_service.is_available():
@@ -81,7 +147,7 @@ class ChatService:
                 "context_used": [],
                 "credits_remaining": credit_status["credits_remaining"],
                 "error": "GROQ_NOT_CONFIGURED",
-                "timestamp": datetime.now(timezone.utc),
+                "timestamp": received_at,
             }
 
         # Gather context based on intent
@@ -89,7 +155,7 @@ class ChatService:
         context_used = list(context.keys())
 
         # Generate response with Groq
-        history_for_llm = (self._history.get(user_uid) or [])[-10:]
+        history_for_llm = self.get_llm_history(user_uid)
 
         groq_succeeded = False
         try:
@@ -118,16 +184,16 @@ class ChatService:
                 logger.warning(f"Credit update failed for user {user_uid}: {credit_result.get('error')}")
             credits_remaining = credit_result.get("credits_remaining", credits_remaining)
 
-        # Store in history
-        self._add_to_history(user_uid, "user", message, intent.value)
-        self._add_to_history(user_uid, "assistant", response)
+        # Store in history; one clock read covers both entries and the response
+        now = datetime.now(timezone.utc)
+        self._add_turn(user_uid, message, intent.value, response, timestamp=now)
 
         return {
             "response": response,
             "intent": intent.value,
             "context_used": context_used,
             "credits_remaining": credits_remaining,
-            "timestamp": datetime.now(timezone.utc)
+            "timestamp": now
         }
 
     async def _gather_context(
@@ -149,67 +215,102 @@ class ChatService:
         context = {}
         required_context = get_required_context(intent)
 
-        try:
-            if "tasks" in required_context or "upcoming_deadlines" in required_context:
-                if role == "teacher":
-                    context["tasks"] = await self._get_teacher_tasks(user_uid)
-                else:
-                    context["tasks"] = await self._get_student_tasks(user_uid)
-
-            if "submissions" in required_context or "pending_evaluations" in required_context:
-                if role == "teacher":
-                    context["submissions"] = await self._get_teacher_recent_submissions(user_uid)
-                else:
-                    context["submissions"] = await self._get_student_recent_submissions(user_uid)
-
-            if "schedule" in required_context:
-                if role == "teacher":
-                    context["schedule"] = await self._get_teacher_overview_schedule(user_uid)
-                else:
-                    context["schedule"] = await self._get_schedule(user_uid)
-
-            if "workload" in required_context:
-                if role == "teacher":
-                    context["workload"] = await self._get_teacher_workload(user_uid)
-                else:
-                    context["workload"] = await self._get_workload(user_uid)
+        wanted: List[str] = []
+        if "tasks" in required_context or "upcoming_deadlines" in required_context:
+            wanted.append("tasks")
+        if "submissions" in required_context or "pending_evaluations" in required_context:
+            wanted.append("submissions")
+        if "schedule" in required_context:
+            wanted.append("schedule")
+        if "workload" in required_context:
+            wanted.append("workload")
 
-        except Exception as e:
-            logger.error(f"Error gathering context: {e}")
+        if role == "teacher":
+            # Every teacher source starts from the same classrooms -> tasks join,
+            # so it is read once and the per-key results are derived from it
+            if not wanted:
+                return context
+            try:
+                return await self._get_teacher_context(user_uid, wanted)
+            except Exception as e:
+                logger.error(f"Error gathering teacher context: {e}")
+                return context
+
+        # Each context source is an independent Mongo fan-out, so run them concurrently
+        sources = {
+            "tasks": self._get_student_tasks,
+            "submissions": self._get_student_recent_submissions,
+            "schedule": self._get_schedule,
+            "workload": self._get_workload,
+        }
+        pending: Dict[str, Any] = {key: sources[key](user_uid) for key in wanted}
+
+        if not pending:
+            return context
+
+        results = await asyncio.gather(*pending.values(), return_exceptions=True)
+        for key, result in zip(pending.keys(), results):
+            if isinstance(result, Exception):
+                logger.error(f"Error gathering {key} context: {result}")
+                continue
+            context[key] = result
 
         return context
 
     async def _get_student_tasks(self, user_uid: str, limit: int = 10) -> List[Dict]:
         """Get student's upcoming tasks"""
         enrollments_collection = get_collection("enrollments")
-        tasks_collection = get_collection("tasks")
-        subjects_collection = get_collection("subjects")
-
-        # Get enrolled subjects
-        enrollments = await enrollments_collection.find(
-            {"student_uid": user_uid}
-        ).to_list(length=None)
-
-        subject_ids = [e.get("subject_id") for e in enrollments if e.get("subject_id")]
-
-        if not subject_ids:
-            return []
-
-        # Get subject names
-        subjects = await subjects_collection.find(
-            {"_id": {"$in": subject_ids}}
-        ).to_list(length=None)
-        subject_names = {str(s["_id"]): s.get("name", "Unknown") for s in subjects}
 
-        # Get tasks
+        # Join enrollments -> tasks -> subjects server-side in one round-trip.
+        # The subject lookup runs after $limit so it only touches returned rows.
         now = datetime.utcnow()
-        tasks = await tasks_collection.find({
-            "subject_id": {"$in": subject_ids},
-            "$or": [
-                {"deadline": {"$gte": now}},
-                {"deadline": None}
-            ]
-        }).sort("deadline", 1).limit(limit).to_list(length=limit)
+        pipeline = [
+            {"$match": {"student_uid": user_uid, "subject_id": {"$ne": None}}},
+            {
+                # Filter, trim and project inside the lookup so only the
+                # fields shown to the student (not evaluation_config etc.)
+                # reach the unwind and sort below
+                "$lookup": {
+                    "from": "tasks",
+                    "let": {"sid": "$subject_id"},
+                    "pipeline": [
+                        {
+                            "$match": {
+                                "$expr": {"$eq": ["$subject_id", "$$sid"]},
+                                "$or": [{"deadline": {"$gte": now}}, {"deadline": None}],
+                            }
+                        },
+                        {"$sort": {"deadline": 1}},
+                        {"$limit": limit},
+                        {"$project": {"title": 1, "deadline": 1, "points": 1, "task_type": 1}},
+                    ],
+                    "as": "task",
+                }
+            },
+            {"$unwind": "$task"},
+            {"$sort": {"task.deadline": 1}},
+            {"$limit": limit},
+            {
+                "$lookup": {
+                    "from": "subjects",
+                    "localField": "subject_id",
+                    "foreignField": "_id",
+                    "as": "subject",
+                }
+            },
+            {
+                "$project": {
+                    "_id": "$task._id",
+                    "title": "$task.title",
+                    "deadline": "$task.deadline",
+                    "points": "$task.points",
+                    "task_type": "$task.task_type",
+                    "subject_name": {"$arrayElemAt": ["$subject.name", 0]},
+                }
+            },
+        ]
+        cursor = await enrollments_collection.aggregate(pipeline)
+        tasks = await cursor.to_list(length=limit)
 
         result = []
         for task in tasks:
@@ -217,7 +318,7 @@ class ChatService:
             result.append({
                 "task_id": str(task.get("_id")) if task.get("_id") else None,
                 "title": task.get("title", "Untitled"),
-                "subject": subject_names.get(str(task.get("subject_id")), "Unknown"),
+                "subject": task.get("subject_name", "Unknown"),
                 "deadline": deadline.strftime("%Y-%m-%d %H:%M") if deadline else "No deadline",
                 "points": task.get("points", 0),
                 "type": task.get("task_type", "general")
@@ -225,70 +326,42 @@ class ChatService:
 
         return result
 
-    async def _get_teacher_tasks(self, teacher_uid: str, limit: int = 10) -> List[Dict]:
-        """Get teacher's tasks across their classrooms"""
-        subjects_collection = get_collection("subjects")
-        tasks_collection = get_collection("tasks")
-
-        subjects = await subjects_collection.find({"teacher_uid": teacher_uid}).to_list(length=None)
-        subject_ids = [s.get("_id") for s in subjects if s.get("_id")]
-        if not subject_ids:
-            return []
-
-        subject_names = {str(s["_id"]): s.get("name", "Unknown") for s in subjects if s.get("_id")}
-
-        tasks = await tasks_collection.find(
-            {"subject_id": {"$in": subject_ids}}
-        ).to_list(length=None)
-
-        def _sort_key(t: dict):
-            d = t.get("deadline")
-            return (d is None, d or datetime.max)
-
-        tasks.sort(key=_sort_key)
-        tasks = tasks[:limit]
-
-        result: List[Dict[str, Any]] = []
-        for task in tasks:
-            deadline = task.get("deadline")
-            result.append(
-                {
-                    "task_id": str(task.get("_id")) if task.get("_id") else None,
-                    "title": task.get("title", "Untitled"),
-                    "subject": subject_names.get(str(task.get("subject_id")), "Unknown"),
-                    "deadline": deadline.strftime("%Y-%m-%d %H:%M") if deadline else "No deadline",
-                    "points": task.get("points", 0),
-                    "type": task.get("task_type", "general"),
-                }
-            )
-
-        return result
-
     async def _get_student_recent_submissions(self, user_uid: str, limit: int = 5) -> List[Dict]:
         """Get student's recent submissions"""
         submissions_collection = get_collection("submissions")
-        tasks_collection = get_collection("tasks")
 
-        submissions = await submissions_collection.find(
-            {"student_uid": user_uid}
-        ).sort("submitted_at", -1).limit(limit).to_list(length=limit)
-
-        if not submissions:
-            return []
-
-        # Get task titles
-        task_ids = [s.get("task_id") for s in submissions if s.get("task_id")]
-        tasks = await tasks_collection.find(
-            {"_id": {"$in": task_ids}}
-        ).to_list(length=None)
-        task_titles = {str(t["_id"]): t.get("title", "Unknown") for t in tasks}
+        pipeline = [
+            {"$match": {"student_uid": user_uid}},
+            {"$sort": {"submitted_at": -1}},
+            {"$limit": limit},
+            {
+                "$lookup": {
+                    "from": "tasks",
+                    "localField": "task_id",
+                    "foreignField": "_id",
+                    "as": "task",
+                }
+            },
+            {
+                "$project": {
+                    "submitted_at": 1,
+                    "score": 1,
+                    "evaluation.ai_score": 1,
+                    "evaluation.status": 1,
+                    "task_title": {"$arrayElemAt": ["$task.title", 0]},
+                }
+            },
+        ]
+        cursor = await submissions_collection.aggregate(pipeline)
+        submissions = await cursor.to_list(length=limit)
 
+        now = datetime.utcnow()
         result = []
         for sub in submissions:
             evaluation = sub.get("evaluation", {})
             result.append({
-                "task_title": task_titles.get(str(sub.get("task_id")), "Unknown"),
-                "submitted_at": sub.get("submitted_at", datetime.utcnow()).strftime("%Y-%m-%d"),
+                "task_title": sub.get("task_title", "Unknown"),
+                "submitted_at": sub.get("submitted_at", now).strftime("%Y-%m-%d"),
                 "score": sub.get("score"),
                 "ai_score": evaluation.get("ai_score"),
                 "status": evaluation.get("status", "pending")
@@ -296,53 +369,9 @@ class ChatService:
 
         return result
 
-    async def _get_teacher_recent_submissions(self, teacher_uid: str, limit: int = 5) -> List[Dict]:
-        """Get most recent submissions for tasks in teacher's classrooms"""
-        subjects_collection = get_collection("subjects")
-        tasks_collection = get_collection("tasks")
-        submissions_collection = get_collection("submissions")
-
-        subjects = await subjects_collection.find({"teacher_uid": teacher_uid}).to_list(length=None)
-        subject_ids = [s.get("_id") for s in subjects if s.get("_id")]
-        if not subject_ids:
-            return []
-
-        tasks = await tasks_collection.find({"subject_id": {"$in": subject_ids}}).to_list(length=None)
-        task_ids = [t.get("_id") for t in tasks if t.get("_id")]
-        if not task_ids:
-            return []
-
-        submissions = await submissions_collection.find({"task_id": {"$in": task_ids}}).sort(
-            "submitted_at", -1
-        ).limit(limit).to_list(length=limit)
-        if not submissions:
-            return []
-
-        task_titles = {str(t.get("_id")): t.get("title", "Unknown") for t in tasks if t.get("_id")}
-
-        result: List[Dict[str, Any]] = []
-        for sub in submissions:
-            evaluation = sub.get("evaluation", {}) or {}
-            score = sub.get("score")
-            status = evaluation.get("status", "pending")
-            result.append(
-                {
-                    "task_title": task_titles.get(str(sub.get("task_id")), "Unknown"),
-                    "student_uid": sub.get("student_uid"),
-                    "submitted_at": sub.get("submitted_at", datetime.utcnow()).strftime("%Y-%m-%d"),
-                    "score": score,
-                    "status": status,
-                }
-            )
-
-        return result
-
     async def _get_schedule(self, user_uid: str, limit: int = 5) -> List[Dict]:
         """Get user's prioritized task schedule"""
-        from app.ai.task_scheduler import TaskScheduler
-
-        scheduler = TaskScheduler()
-        schedule = await scheduler.generate_schedule(user_uid)
+        schedule = await self._scheduler.generate_schedule(user_uid)
 
         result = []
         for scheduled_task in schedule.tasks[:limit]:
@@ -357,29 +386,9 @@ class ChatService:
 
         return result
 
-    async def _get_teacher_overview_schedule(self, teacher_uid: str, limit: int = 5) -> List[Dict]:
-        """Lightweight teacher 'schedule' based on upcoming task deadlines."""
-        tasks = await self._get_teacher_tasks(teacher_uid, limit=limit)
-        result: List[Dict[str, Any]] = []
-        for t in tasks[:limit]:
-            deadline = t.get("deadline") or "No deadline"
-            result.append(
-                {
-                    "title": t.get("title", "Untitled"),
-                    "deadline": deadline,
-                    "points": t.get("points", 0),
-                    "priority": None,
-                    "band": "normal",
-                }
-            )
-        return result
-
     async def _get_workload(self, user_uid: str) -> Dict[str, Any]:
         """Get user's current workload metrics"""
-        from app.ai.context_manager import ContextManager
-
-        context_manager = ContextManager()
-        workload = await context_manager.get_workload(user_uid)
+        workload = await self._context_manager.get_workload(user_uid)
 
         return {
             "pending": workload.get("pending_count", 0),
@@ -387,27 +396,195 @@ class ChatService:
             "due_soon": workload.get("due_soon_count", 0)
         }
 
-    async def _get_teacher_workload(self, teacher_uid: str) -> Dict[str, Any]:
-        """Get teacher workload metrics (e.g., ungraded submissions)."""
+    async def _get_teacher_context(self, teacher_uid: str, wanted: List[str]) -> Dict[str, Any]:
+        """
+        Build teacher context (tasks, schedule, submissions, workload).
+
+        One aggregation joins the teacher's classrooms to their tasks and, via
+        $facet, returns both the upcoming tasks and every task id. The recent
+        submissions and ungraded count then run concurrently against those ids.
+        """
+        overview = await self._get_teacher_overview(teacher_uid, limit=10)
+        subject_count = overview["subject_count"]
+        task_ids = overview["task_ids"]
+
+        context: Dict[str, Any] = {}
+        if "tasks" in wanted:
+            context["tasks"] = overview["tasks"]
+        if "schedule" in wanted:
+            # Lightweight teacher "schedule" based on upcoming task deadlines
+            context["schedule"] = [
+                {
+                    "title": t["title"],
+                    "deadline": t["deadline"],
+                    "points": t["points"],
+                    "priority": None,
+                    "band": "normal",
+                }
+                for t in overview["tasks"][:5]
+            ]
+
+        pending: Dict[str, Any] = {}
+        if "submissions" in wanted:
+            pending["submissions"] = self._get_teacher_recent_submissions(task_ids)
+        if "workload" in wanted:
+            pending["workload"] = self._count_ungraded(teacher_uid, task_ids)
+
+        results = await asyncio.gather(*pending.values(), return_exceptions=True)
+        for key, result in zip(pending.keys(), results):
+            if isinstance(result, Exception):
+                logger.error(f"Error gathering {key} context: {result}")
+                continue
+            if key == "workload":
+                result = {"ungraded_submissions": result, "active_classrooms": subject_count}
+            context[key] = result
+
+        return context
+
+    async def _get_teacher_overview(self, teacher_uid: str, limit: int = 10) -> Dict[str, Any]:
+        """Get classroom count, all task ids and the next tasks due for a teacher"""
         subjects_collection = get_collection("subjects")
-        tasks_collection = get_collection("tasks")
+
+        pipeline = [
+            {"$match": {"teacher_uid": teacher_uid}},
+            {"$limit": _MAX_TEACHER_SUBJECTS},
+            {
+                # Project inside the lookup so subjects carry only the fields
+                # used below, not whole task documents (evaluation_config etc.)
+                "$lookup": {
+                    "from": "tasks",
+                    "let": {"sid": "$_id"},
+                    "pipeline": [
+                        {"$match": {"$expr": {"$eq": ["$subject_id", "$$sid"]}}},
+                        {"$limit": _MAX_TEACHER_TASKS},
+                        {"$project": {"_id": 1, "title": 1, "deadline": 1, "points": 1, "task_type": 1}},
+                    ],
+                    "as": "tasks",
+                }
+            },
+            {"$project": {"name": 1, "tasks": 1}},
+            {
+                "$facet": {
+                    "summary": [{"$group": {"_id": None, "subject_count": {"$sum": 1}}}],
+                    "task_ids": [
+                        {"$unwind": "$tasks"},
+                        {"$limit": _MAX_TEACHER_TASKS},
+                        {"$group": {"_id": None, "ids": {"$push": "$tasks._id"}}},
+                    ],
+                    # Tasks without a deadline sort last
+                    "upcoming": [
+                        {"$unwind": "$tasks"},
+                        {"$addFields": {"no_deadline": {"$eq": [{"$ifNull": ["$tasks.deadline", None]}, None]}}},
+                        {"$sort": {"no_deadline": 1, "tasks.deadline": 1}},
+                        {"$limit": limit},
+                        {
+                            "$project": {
+                                "_id": "$tasks._id",
+                                "title": "$tasks.title",
+                                "deadline": "$tasks.deadline",
+                                "points": "$tasks.points",
+                                "task_type": "$tasks.task_type",
+                                "subject_name": "$name",
+                            }
+                        },
+                    ],
+                }
+            },
+        ]
+        cursor = await subjects_collection.aggregate(pipeline)
+        rows = await cursor.to_list(length=1)
+        facets = rows[0] if rows else {}
+        summary = (facets.get("summary") or [{}])[0]
+        task_ids = (facets.get("task_ids") or [{}])[0].get("ids") or []
+
+        tasks: List[Dict[str, Any]] = []
+        for task in facets.get("upcoming") or []:
+            deadline = task.get("deadline")
+            tasks.append(
+                {
+                    "task_id": str(task.get("_id")) if task.get("_id") else None,
+                    "title": task.get("title", "Untitled"),
+                    "subject": task.get("subject_name") or "Unknown",
+                    "deadline": deadline.strftime("%Y-%m-%d %H:%M") if deadline else "No deadline",
+                    "points": task.get("points", 0),
+                    "type": task.get("task_type", "general"),
+                }
+            )
+
+        return {
+            "subject_count": int(summary.get("subject_count") or 0),
+            "task_ids": task_ids,
+            "tasks": tasks,
+        }
+
+    async def _get_teacher_recent_submissions(self, task_ids: List[Any], limit: int = 5) -> List[Dict]:
+        """Get most recent submissions for the given teacher task ids"""
+        if not task_ids:
+            return []
+
         submissions_collection = get_collection("submissions")
+        pipeline = [
+            {"$match": {"task_id": {"$in": task_ids}}},
+            {"$sort": {"submitted_at": -1}},
+            {"$limit": limit},
+            {
+                "$lookup": {
+                    "from": "tasks",
+                    "localField": "task_id",
+                    "foreignField": "_id",
+                    "as": "task",
+                }
+            },
+            {
+                "$project": {
+                    "student_uid": 1,
+                    "submitted_at": 1,
+                    "score": 1,
+                    "evaluation.status": 1,
+                    "task_title": {"$arrayElemAt": ["$task.title", 0]},
+                }
+            },
+        ]
+        cursor = await submissions_collection.aggregate(pipeline)
+        submissions = await cursor.to_list(length=limit)
+
+        now = datetime.utcnow()
+        result: List[Dict[str, Any]] = []
+        for sub in submissions:
+            evaluation = sub.get("evaluation", {}) or {}
+            result.append(
+                {
+                    "task_title": sub.get("task_title") or "Unknown",
+                    "student_uid": sub.get("student_uid"),
+                    "submitted_at": sub.get("submitted_at", now).strftime("%Y-%m-%d"),
+                    "score": sub.get("score"),
+                    "status": evaluation.get("status", "pending"),
+                }
+            )
 
-        subjects = await subjects_collection.find({"teacher_uid": teacher_uid}).to_list(length=None)
-        subject_ids = [s.get("_id") for s in subjects if s.get("_id")]
-        if not subject_ids:
-            return {"ungraded_submissions": 0, "active_classrooms": 0}
+        return result
 
-        tasks = await tasks_collection.find({"subject_id": {"$in": subject_ids}}).to_list(length=None)
-        task_ids = [t.get("_id") for t in tasks if t.get("_id")]
+    async def _count_ungraded(self, teacher_uid: str, task_ids: List[Any]) -> int:
+        """Count submissions still awaiting a score for the given task ids"""
         if not task_ids:
-            return {"ungraded_submissions": 0, "active_classrooms": len(subject_ids)}
+            return 0
 
-        ungraded = await submissions_collection.count_documents(
-            {"task_id": {"$in": task_ids}, "score": None}
-        )
+        now = time.monotonic()
+        cached = self._ungraded_cache.get(teacher_uid)
+        if cached is not None and cached[0] > now:
+            return cached[1]
 
-        return {"ungraded_submissions": int(ungraded), "active_classrooms": len(subject_ids)}
+        submissions_collection = get_collection("submissions")
+        ungraded = int(await submissions_collection.count_documents(
+            {"task_id": {"$in": task_ids}, "score": None}
+        ))
+        cache = self._ungraded_cache
+        cache[teacher_uid] = (now + _UNGRADED_CACHE_TTL_SECONDS, ungraded)
+        cache.move_to_end(teacher_uid)
+        # Drop expired entries from the front, then enforce the size cap
+        while len(cache) > _UNGRADED_CACHE_MAX_TEACHERS or next(iter(cache.values()))[0] <= now:
+            cache.popitem(last=False)
+        return ungraded
 
     def _fallback_response(self, intent: ChatIntent, context: Dict, role: str) -> str:
         """Generate a fallback response without Groq"""
@@ -419,13 +596,14 @@ class ChatService:
             return "I couldn't answer that right now. Please try again in a moment."
 
         if intent == ChatIntent.TASK_INFO:
-            tasks = context.get("tasks", [])
             if tasks:
-                task_list = "\n".join([
-                    f"- {t.get('title', 'Untitled')} ({t.get('subject', 'Subject')}): due {t.get('deadline', 'No deadline')}, {t.get('points', 0)} points"
-                    for t in tasks[:5]
-                ])
-                return f"Here are your upcoming tasks:\n{task_list}"
+                # title/deadline/points are always set by the context builders
+                lines = ["Here are your upcoming tasks:"]
+                for t in tasks[:5]:
+                    lines.append(
+                        f"- {t['title']} ({t.get('subject', 'Subject')}): due {t['deadline']}, {t['points']} points"
+                    )
+                return "\n".join(lines)
             if role == "teacher":
                 return "I couldn't find any tasks in your classrooms yet. Create a classroom and add tasks, then ask me again."
             return "You don't have any upcoming tasks."
@@ -436,17 +614,11 @@ class ChatService:
             return "Ask me about your tasks, deadlines, or your submission status."
 
         elif intent == ChatIntent.SUBMISSION_STATUS:
-            submissions = context.get("submissions", [])
             if submissions:
-                sub_list = "\n".join([
-                    (
-                        f"- {s.get('task_title', 'Task')}: "
-                        f"{'graded' if s.get('score') is not None else 'pending'}"
-                        + (f" (score: {s.get('score')})" if s.get('score') is not None else "")
-                    )
-                    for s in submissions[:5]
-                ])
-                return f"Here are your recent submissions:\n{sub_list}"
+                lines = ["Here are your recent submissions:"]
+                for s in submissions[:5]:
+                    lines.append(_format_submission_line(s.get("task_title", "Task"), s.get("score")))
+                return "\n".join(lines)
             if role == "teacher":
                 ungraded = workload.get("ungraded_submissions")
                 if isinstance(ungraded, int) and ungraded > 0:
@@ -454,13 +626,12 @@ class ChatService:
             return "You don't have any recent submissions."
 
         elif intent == ChatIntent.SCHEDULE_HELP:
-            schedule = context.get("schedule", [])
+            schedule = context.get("schedule", []) or []
             if schedule:
-                task_list = "\n".join([
-                    f"- {t['title']}: {t['band']} priority"
-                    for t in schedule[:5]
-                ])
-                return f"Based on your deadlines and points, here's what you should prioritize:\n{task_list}"
+                lines = ["Based on your deadlines and points, here's what you should prioritize:"]
+                for t in schedule[:5]:
+                    lines.append(f"- {t['title']}: {t['band']} priority")
+                return "\n".join(lines)
             return "You don't have any pending tasks to prioritize."
 
         if role == "teacher":
@@ -480,26 +651,56 @@ class ChatService:
         user_uid: str,
         role: str,
         content: str,
-        intent: str = None
+        intent: str = None,
+        timestamp: Optional[datetime] = None
     ):
         """Add message to conversation history"""
-        if user_uid not in self._history:
-            self._history[user_uid] = []
-
-        self._history[user_uid].append({
-            "role": role,
-            "content": content,
-            "intent": intent,
-            "timestamp": datetime.now(timezone.utc)
-        })
+        self._session_history(user_uid).append(
+            _HistoryEntry(role, content, intent, timestamp or datetime.now(timezone.utc))
+        )
 
-        # Keep only last 20 messages per user
-        if len(self._history[user_uid]) > 20:
-            self._history[user_uid] = self._history[user_uid][-20:]
+    def _add_turn(
+        self,
+        user_uid: str,
+        user_message: str,
+        intent: str,
+        assistant_message: str,
+        timestamp: Optional[datetime] = None
+    ):
+        """Add a user message and the assistant's reply with one history lookup"""
+        timestamp = timestamp or datetime.now(timezone.utc)
+        self._session_history(user_uid).extend((
+            _HistoryEntry("user", user_message, intent, timestamp),
+            _HistoryEntry("assistant", assistant_message, None, timestamp),
+        ))
+
+    def _session_history(self, user_uid: str) -> Deque[_HistoryEntry]:
+        """Get or create a user's history, marking it most recently used"""
+        history = self._history.get(user_uid)
+        if history is None:
+            # deque(maxlen=...) drops the oldest message once the cap is reached
+            history = self._history[user_uid] = deque(maxlen=_HISTORY_MAX_MESSAGES)
+            while len(self._history) > self._max_sessions:
+                self._history.popitem(last=False)
+        else:
+            self._history.move_to_end(user_uid)
+        return history
 
     def get_history(self, user_uid: str) -> List[Dict]:
         """Get conversation history for a user"""
-        return self._history.get(user_uid, [])
+        history = self._history.get(user_uid)
+        if history is None:
+            return []
+        self._history.move_to_end(user_uid)
+        return [entry._asdict() for entry in history]
+
+    def get_llm_history(self, user_uid: str, limit: int = _LLM_HISTORY_MESSAGES) -> List[Dict]:
+        """Get the most recent messages in chat-completion form (role and content only)"""
+        history = self._history.get(user_uid)
+        if not history:
+            return []
+        recent = islice(history, max(0, len(history) - limit), None)
+        return [{"role": entry.role, "content": entry.content} for entry in recent]
 
     def clear_history(self, user_uid: str):
         """Clear conversation history for a user"""
@@ -507,13 +708,27 @@ class ChatService:
             del self._history[user_uid]
 
 
+def _format_submission_line(task_title: str, score: Any) -> str:
+    if score is None:
+        return f"- {task_title}: pending"
+    return f"- {task_title}: graded (score: {score})"
+
+
 # Factory function
-_CHAT_SERVICE_INSTANCE: Optional[ChatService] = None
+# One ChatService per database. PyMongo AsyncDatabase handles compare equal
+# by client and name, and get_database() builds a fresh handle on each call,
+# so the handle itself is the key rather than its id(). The lock stops two
+# threads from each building a service (and splitting history) on first use.
+_CHAT_SERVICES: Dict[AsyncDatabase, ChatService] = {}
+_CHAT_SERVICES_LOCK = threading.Lock()
 
 
-def get_chat_service(db: AsyncIOMotorDatabase) -> ChatService:
+def get_chat_service(db: AsyncDatabase) -> ChatService:
     """Get chat service instance with database connection"""
-    global _CHAT_SERVICE_INSTANCE
-    if _CHAT_SERVICE_INSTANCE is None:
-        _CHAT_SERVICE_INSTANCE = ChatService(db)
-    return _CHAT_SERVICE_INSTANCE
+    service = _CHAT_SERVICES.get(db)
+    if service is None:
+        with _CHAT_SERVICES_LOCK:
+            service = _CHAT_SERVICES.get(db)
+            if service is None:
+                service = _CHAT_SERVICES[db] = ChatService(db)
+    return service
@@ -5,10 +5,14 @@ Students: 25 messages/day
 Teachers: 50 messages/day
 """
 
+import asyncio
 import logging
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Dict, List, Optional
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo import ReturnDocument
 
 logger = logging.getLogger(__name__)
 
@@ -17,13 +21,38 @@ _CREDIT_LIMITS = {
     "teacher": 50,
 }
 
+# Process-wide cache of credit records (user_uid -> credits_used, credits_limit,
+# resets_at, expires_at). Shared by every CreditService instance so a reset
+# through one instance is seen by the others. Other worker processes can
+# reset or spend credits behind it, so entries live only briefly and an
+# exhausted entry is never served from cache.
+_CACHE_MAX_USERS = 10_000
+_CACHE_TTL_SECONDS = 30
+_credit_cache: "OrderedDict[str, Dict]" = OrderedDict()
+
+
+def _cache_put(user_uid: str, record: dict) -> None:
+    _credit_cache[user_uid] = {
+        "credits_used": record.get("credits_used", 0),
+        "credits_limit": record.get("credits_limit"),
+        "resets_at": record.get("resets_at"),
+        "expires_at": time.monotonic() + _CACHE_TTL_SECONDS,
+    }
+    _credit_cache.move_to_end(user_uid)
+    while len(_credit_cache) > _CACHE_MAX_USERS:
+        _credit_cache.popitem(last=False)
+
 
 class CreditService:
     """Service for managing AI chat credits"""
 
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncDatabase):
         self.db = db
         self.collection = db.ai_credits
+        # Cache-miss reads issued in the same event-loop tick are coalesced
+        # into one $in query (see _find_record)
+        self._pending_reads: Dict[str, List[asyncio.Future]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
 
     def _get_credit_limit(self, role: str) -> int:
         r = str(role or "student").lower()
@@ -33,71 +62,136 @@ class CreditService:
         """Create necessary database indexes"""
         await self.collection.create_index("user_uid", unique=True)
         await self.collection.create_index("last_reset")
+        await self.collection.create_index(
+            "resets_at", expireAfterSeconds=0, name="ttl_ai_credits_resets_at"
+        )
 
-    async def get_credits(self, user_uid: str, role: str) -> dict:
+    @staticmethod
+    def _is_expired(record: dict, now: datetime) -> bool:
+        resets_at = record.get("resets_at")
+        if resets_at is None:
+            # Records written before resets_at existed: compare reset day
+            last_reset = record.get("last_reset", now)
+            return last_reset.date() < now.date()
+        return resets_at <= now
+
+    async def get_credits(self, user_uid: str, role: str, now: Optional[datetime] = None) -> dict:
         """
         Get current credit status for a user.
         Creates record if doesn't exist.
 
+        Args:
+            now: Naive UTC time of the caller's request, if it already has one
+
         Returns:
             dict with credits_remaining, credits_limit, resets_at
         """
-        # Get or create credit record
-        record = await self.collection.find_one({"user_uid": user_uid})
-
-        now = datetime.utcnow()
+        now = now or datetime.utcnow()
         credit_limit = self._get_credit_limit(role)
 
         # Calculate next reset time (midnight UTC)
         tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
 
-        if record is None:
-            # Create new record
-            record = {
-                "user_uid": user_uid,
+        cached = _credit_cache.get(user_uid)
+        if (
+            cached is not None
+            and cached["credits_limit"] == credit_limit
+            and cached["resets_at"] is not None
+            and cached["resets_at"] > now
+            and cached["expires_at"] > time.monotonic()
+            and cached["credits_used"] < credit_limit
+        ):
+            _credit_cache.move_to_end(user_uid)
+            return self._status(cached, credit_limit, tomorrow)
+
+        # Get or create credit record
+        record = await self._find_record(user_uid)
+
+        if record is None or self._is_expired(record, now):
+            # Records are reaped by the TTL index on resets_at; the expiry check
+            # covers the window before Mongo's TTL monitor gets to them.
+            fresh = {
                 "role": role,
                 "credits_used": 0,
                 "credits_limit": credit_limit,
                 "last_reset": now,
-                "created_at": now,
-                "updated_at": now
+                "resets_at": tomorrow,
+                "updated_at": now,
             }
-            await self.collection.insert_one(record)
+            await self.collection.update_one(
+                {"user_uid": user_uid},
+                {"$set": fresh, "$setOnInsert": {"created_at": now}},
+                upsert=True,
+            )
+            record = {"user_uid": user_uid, **fresh}
         else:
-            # Check if we need to reset (new day)
-            last_reset = record.get("last_reset", now)
-            last_reset_date = last_reset.replace(hour=0, minute=0, second=0, microsecond=0)
-            today = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
-            if last_reset_date < today:
-                # New day - reset credits
-                await self.collection.update_one(
-                    {"user_uid": user_uid},
-                    {
-                        "$set": {
-                            "credits_used": 0,
-                            "last_reset": now,
-                            "updated_at": now,
-                            "credits_limit": credit_limit  # Update in case role changed
-                        }
-                    }
-                )
-                record["credits_used"] = 0
-                record["credits_limit"] = credit_limit
-            elif record.get("credits_limit") != credit_limit:
-                await self.collection.update_one(
-                    {"user_uid": user_uid},
-                    {"$set": {"credits_limit": credit_limit, "updated_at": now, "role": role}},
-                )
-                record["credits_limit"] = credit_limit
-
-        credits_remaining = max(0, record.get("credits_limit", credit_limit) - record.get("credits_used", 0))
-
+            repair = {}
+            if record.get("resets_at") is None:
+                # Same-day record written before resets_at existed; _consume
+                # only matches records that have it, so backfill it in place
+                repair["resets_at"] = tomorrow
+            if record.get("credits_limit") != credit_limit:
+                repair["credits_limit"] = credit_limit
+                repair["role"] = role
+            if repair:
+                repair["updated_at"] = now
+                await self.collection.update_one({"user_uid": user_uid}, {"$set": repair})
+                record.update(repair)
+
+        _cache_put(user_uid, record)
+        return self._status(record, credit_limit, tomorrow)
+
+    async def _find_record(self, user_uid: str) -> Optional[dict]:
+        """Queue a record read; concurrent callers share one round trip."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._pending_reads:
+            self._flush_task = loop.create_task(self._flush_reads())
+        self._pending_reads.setdefault(user_uid, []).append(future)
+        return await future
+
+    async def _flush_reads(self):
+        pending, self._pending_reads = self._pending_reads, {}
+        try:
+            if len(pending) == 1:
+                (user_uid,) = pending
+                doc = await self.collection.find_one({"user_uid": user_uid})
+                records = {user_uid: doc} if doc else {}
+            else:
+                docs = await self.collection.find(
+                    {"user_uid": {"$in": list(pending)}}
+                ).to_list(length=len(pending))
+                records = {doc["user_uid"]: doc for doc in docs}
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for user_uid, futures in pending.items():
+            doc = records.get(user_uid)
+            for future in futures:
+                if not future.done():
+                    # Callers mutate the record, so each gets its own copy
+                    future.set_result(dict(doc) if doc else None)
+
+    async def warm(self, user_uid: str, role: str) -> None:
+        """Load a user's credit record into the cache ahead of their first chat message."""
+        try:
+            await self.get_credits(user_uid, role)
+        except Exception as e:
+            logger.warning(f"Credit cache warm-up failed for user {user_uid}: {e}")
+
+    @staticmethod
+    def _status(record: dict, credit_limit: int, resets_at: datetime) -> dict:
+        credits_limit = record.get("credits_limit", credit_limit)
+        credits_used = record.get("credits_used", 0)
         return {
-            "credits_remaining": credits_remaining,
-            "credits_limit": record.get("credits_limit", credit_limit),
-            "credits_used": record.get("credits_used", 0),
-            "resets_at": tomorrow.isoformat() + "Z"
+            "credits_remaining": max(0, credits_limit - credits_used),
+            "credits_limit": credits_limit,
+            "credits_used": credits_used,
+            "resets_at": resets_at.isoformat() + "Z"
         }
 
     async def use_credit(self, user_uid: str, role: str) -> dict:
@@ -107,39 +201,50 @@ class CreditService:
         Returns:
             dict with success, credits_remaining, error (if any)
         """
-        # Get current status first
-        status = await self.get_credits(user_uid, role)
-
-        if status["credits_remaining"] <= 0:
-            return {
-                "success": False,
-                "credits_remaining": 0,
-                "error": "Daily message limit reached. Credits reset at midnight UTC."
-            }
-
-        # Decrement credit
-        result = await self.collection.update_one(
-            {"user_uid": user_uid},
-            {
-                "$inc": {"credits_used": 1},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
-        )
-
-        if result.modified_count == 0:
-            return {
-                "success": False,
-                "credits_remaining": status["credits_remaining"],
-                "error": "Failed to update credits"
-            }
+        # Check-and-increment in one atomic round trip; only a live record with
+        # credits left matches, so concurrent messages cannot overspend.
+        record = await self._consume(user_uid)
 
+        if record is None:
+            # Missing/expired record or limit reached: refresh it (get_credits
+            # rolls over an expired day) and retry once if credits remain.
+            _credit_cache.pop(user_uid, None)
+            status = await self.get_credits(user_uid, role)
+            if status["credits_remaining"] <= 0:
+                return {
+                    "success": False,
+                    "credits_remaining": 0,
+                    "error": "Daily message limit reached. Credits reset at midnight UTC."
+                }
+            record = await self._consume(user_uid)
+            if record is None:
+                return {
+                    "success": False,
+                    "credits_remaining": status["credits_remaining"],
+                    "error": "Failed to update credits"
+                }
+
+        _cache_put(user_uid, record)
+        credits_limit = record.get("credits_limit", self._get_credit_limit(role))
         return {
             "success": True,
-            "credits_remaining": status["credits_remaining"] - 1,
-            "credits_limit": status["credits_limit"],
+            "credits_remaining": max(0, credits_limit - record.get("credits_used", 0)),
+            "credits_limit": credits_limit,
             "error": None
         }
 
+    async def _consume(self, user_uid: str) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {
+                "user_uid": user_uid,
+                "resets_at": {"$gt": now},
+                "$expr": {"$lt": ["$credits_used", "$credits_limit"]},
+            },
+            {"$inc": {"credits_used": 1}, "$set": {"updated_at": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+
     async def reset_credits(self, user_uid: str, role: str = None) -> dict:
         """
         Manually reset credits for a user (admin function).
@@ -152,10 +257,12 @@ class CreditService:
             dict with success status
         """
         now = datetime.utcnow()
+        tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
 
         update_data = {
             "credits_used": 0,
             "last_reset": now,
+            "resets_at": tomorrow,
             "updated_at": now
         }
 
@@ -177,10 +284,12 @@ class CreditService:
                 "credits_used": 0,
                 "credits_limit": credit_limit,
                 "last_reset": now,
+                "resets_at": tomorrow,
                 "created_at": now,
                 "updated_at": now
             })
 
+        _credit_cache.pop(user_uid, None)
         return {"success": True, "message": f"Credits reset for user {user_uid}"}
 
     async def get_all_credits_admin(self, skip: int = 0, limit: int = 50) -> dict:
@@ -208,6 +317,6 @@ class CreditService:
 
 
 # Factory function to create service with database
-def get_credit_service(db: AsyncIOMotorDatabase) -> CreditService:
+def get_credit_service(db: AsyncDatabase) -> CreditService:
     """Get credit service instance with database connection"""
     return CreditService(db)
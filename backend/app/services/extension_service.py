@@ -3,11 +3,16 @@ Extension Service
 Manages deadline extension requests with AI workload analysis
 """
 
+import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import Optional, List
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, List, Tuple
 from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from pymongo.asynchronous.database import AsyncDatabase
 
 from app.models.extension import (
     ExtensionRequestCreate,
@@ -16,14 +21,31 @@ from app.models.extension import (
     WorkloadSnapshot,
     ExtensionStats
 )
+from app.utils.helpers import ensure_utc
 
 logger = logging.getLogger(__name__)
 
+# Submissions sampled for the workload snapshot's average submission time
+_SUBMISSION_TIMING_SAMPLE = 30
+
+# Process-wide teacher_uid -> (expires_at, subject id strings), oldest write
+# first. ExtensionService is built per request, so the cache lives at module
+# level; subject create and delete invalidate it through
+# invalidate_teacher_subjects.
+_TEACHER_SUBJECTS_TTL_SECONDS = 60
+_TEACHER_SUBJECTS_MAX_TEACHERS = 10_000
+_teacher_subjects_cache: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+
+
+def invalidate_teacher_subjects(teacher_uid: str) -> None:
+    """Drop a teacher's cached subject ids after their subjects change."""
+    _teacher_subjects_cache.pop(teacher_uid, None)
+
 
 class ExtensionService:
     """Service for managing extension requests"""
 
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncDatabase):
         self.db = db
         self.collection = db.extensions
         self.tasks_collection = db.tasks
@@ -39,52 +61,64 @@ class ExtensionService:
         next_week = now + timedelta(days=7)
 
         # Get all tasks for student (through enrollments)
-        enrollments = await self.db.enrollments.find({"student_uid": student_uid}).to_list(None)
+        enrollments = await self.db.enrollments.find(
+            {"student_uid": student_uid}, {"subject_id": 1}
+        ).to_list(None)
         subject_ids = [e["subject_id"] for e in enrollments]
 
-        # Get all tasks from enrolled subjects
-        all_tasks = await self.tasks_collection.find({
-            "subject_id": {"$in": subject_ids}
-        }).to_list(None)
-
-        # Get all submissions from this student
-        submissions = await self.submissions_collection.find({
-            "student_uid": student_uid
-        }).to_list(None)
-
-        submitted_task_ids = {str(s["task_id"]) for s in submissions}
+        # Bucket the student's unsubmitted tasks server-side; only the counts
+        # and the first ten upcoming deadlines come back over the wire.
+        pipeline = [
+            {"$match": {"subject_id": {"$in": subject_ids}, "deadline": {"$ne": None}}},
+            {"$lookup": {
+                "from": "submissions",
+                "let": {"tid": "$_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$and": [
+                        {"$eq": ["$student_uid", student_uid]},
+                        {"$eq": ["$task_id", "$$tid"]},
+                    ]}}},
+                    {"$limit": 1},
+                    {"$project": {"_id": 1}},
+                ],
+                "as": "submission",
+            }},
+            {"$match": {"submission": {"$size": 0}}},
+            {"$facet": {
+                "pending": [
+                    {"$group": {
+                        "_id": None,
+                        "count": {"$sum": 1},
+                        "points": {"$sum": {"$ifNull": ["$points", 0]}},
+                    }},
+                ],
+                "overdue": [
+                    {"$match": {"deadline": {"$lt": now}}},
+                    {"$count": "count"},
+                ],
+                "upcoming": [
+                    {"$match": {"deadline": {"$gte": now, "$lte": next_week}}},
+                    {"$sort": {"deadline": 1}},
+                    {"$limit": 10},
+                    {"$project": {"title": 1, "deadline": 1, "points": 1}},
+                ],
+            }},
+        ]
+        cursor = await self.tasks_collection.aggregate(pipeline)
+        rows = await cursor.to_list(length=1)
+        facets = rows[0] if rows else {}
+        pending = (facets.get("pending") or [{}])[0]
+        overdue = (facets.get("overdue") or [{}])[0]
 
-        # Calculate metrics
-        pending_tasks = []
-        overdue_tasks = []
         upcoming_deadlines = []
-        total_points = 0
-
-        for task in all_tasks:
-            task_id = str(task["_id"])
-            if task_id in submitted_task_ids:
-                continue  # Skip submitted tasks
-
-            deadline = task.get("deadline")
-            if not deadline:
-                continue
-
-            points = task.get("points", 0)
-            total_points += points
-
-            task_info = {
-                "task_id": task_id,
+        for task in facets.get("upcoming", []):
+            deadline = task["deadline"]
+            upcoming_deadlines.append({
+                "task_id": str(task["_id"]),
                 "title": task.get("title", ""),
                 "deadline": deadline.isoformat() if isinstance(deadline, datetime) else str(deadline),
-                "points": points
-            }
-
-            if deadline < now:
-                overdue_tasks.append(task_info)
-            elif deadline <= next_week:
-                upcoming_deadlines.append(task_info)
-
-            pending_tasks.append(task_info)
+                "points": task.get("points") or 0
+            })
 
         # Calculate recent submission activity
         recent_submissions = await self.submissions_collection.count_documents({
@@ -92,27 +126,42 @@ class ExtensionService:
             "submitted_at": {"$gte": now - timedelta(days=7)}
         })
 
-        # Calculate average submission time (how early/late they submit)
-        avg_submission_time = None
-        submission_times = []
-        for sub in submissions:
-            if sub.get("submitted_at") and sub.get("task_id"):
-                task = await self.tasks_collection.find_one({"_id": sub["task_id"]})
-                if task and task.get("deadline"):
-                    time_diff = (task["deadline"] - sub["submitted_at"]).total_seconds() / 3600  # hours
-                    submission_times.append(time_diff)
-
-        if submission_times:
-            avg_submission_time = sum(submission_times) / len(submission_times)
+        # Average hours between submission and deadline (how early/late they
+        # submit) over the most recent submissions, averaged server-side
+        timing_pipeline = [
+            {"$match": {"student_uid": student_uid, "submitted_at": {"$ne": None}}},
+            {"$sort": {"submitted_at": -1}},
+            {"$limit": _SUBMISSION_TIMING_SAMPLE},
+            {"$lookup": {
+                "from": "tasks",
+                "let": {"tid": "$task_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$tid"]}}},
+                    {"$project": {"deadline": 1}},
+                ],
+                "as": "task",
+            }},
+            {"$unwind": "$task"},
+            {"$match": {"task.deadline": {"$ne": None}}},
+            {"$group": {
+                "_id": None,
+                "avg_hours": {"$avg": {"$divide": [
+                    {"$subtract": ["$task.deadline", "$submitted_at"]}, 3600 * 1000
+                ]}},
+            }},
+        ]
+        cursor = await self.submissions_collection.aggregate(timing_pipeline)
+        timing = await cursor.to_list(length=1)
+        avg_submission_time = timing[0]["avg_hours"] if timing else None
 
         return WorkloadSnapshot(
-            pending_tasks=len(pending_tasks),
-            overdue_tasks=len(overdue_tasks),
-            upcoming_deadlines=upcoming_deadlines[:10],  # Limit to 10
+            pending_tasks=pending.get("count", 0),
+            overdue_tasks=overdue.get("count", 0),
+            upcoming_deadlines=upcoming_deadlines,
             recent_submissions=recent_submissions,
             average_submission_time=avg_submission_time,
             current_subjects=len(subject_ids),
-            total_points_at_stake=total_points
+            total_points_at_stake=pending.get("points", 0)
         )
 
     async def create_extension_request(
@@ -124,8 +173,14 @@ class ExtensionService:
         """
         Create a new extension request with AI analysis
         """
-        # Get task details
-        task = await self.tasks_collection.find_one({"_id": ObjectId(request_data.task_id)})
+        # The workload snapshot only feeds the AI analysis and does not depend
+        # on the task, so it is fetched alongside the task when needed.
+        task_f = self.tasks_collection.find_one({"_id": ObjectId(request_data.task_id)})
+        workload = None
+        if groq_service:
+            task, workload = await asyncio.gather(task_f, self.get_workload_snapshot(student_uid))
+        else:
+            task = await task_f
         if not task:
             raise ValueError("Task not found")
 
@@ -141,34 +196,13 @@ class ExtensionService:
         if not enrollment:
             raise ValueError("Student not enrolled in this subject")
 
-        # Check if extension already requested for this task
-        existing = await self.collection.find_one({
-            "student_uid": student_uid,
-            "task_id": request_data.task_id,
-            "status": "pending"
-        })
-        if existing:
-            raise ValueError("Extension request already pending for this task")
-
-        # Calculate extension days
-        # Handle timezone awareness to avoid "can't subtract offset-naive and offset-aware datetimes"
-        req_deadline = request_data.requested_deadline
-        curr_deadline = current_deadline
-
-        if req_deadline.tzinfo is None:
-            req_deadline = req_deadline.replace(tzinfo=timezone.utc)
-        
-        if curr_deadline.tzinfo is None:
-            curr_deadline = curr_deadline.replace(tzinfo=timezone.utc)
-
-        extension_days = (req_deadline - curr_deadline).days
+        # requested_deadline is UTC-aware from the model; stored deadlines
+        # come back from Mongo naive
+        extension_days = (request_data.requested_deadline - ensure_utc(current_deadline)).days
 
         if extension_days <= 0:
             raise ValueError("Requested deadline must be after current deadline")
 
-        # Get workload snapshot
-        workload = await self.get_workload_snapshot(student_uid)
-
         # Generate AI analysis
         ai_analysis = None
         if groq_service:
@@ -188,14 +222,14 @@ class ExtensionService:
         now = datetime.utcnow()
         extension_doc = {
             "student_uid": student_uid,
-            "task_id": request_data.task_id,
+            "task_id": task["_id"],
             "subject_id": str(task["subject_id"]),
             "current_deadline": current_deadline,
             "requested_deadline": request_data.requested_deadline,
             "extension_days": extension_days,
             "reason": request_data.reason,
             "status": "pending",
-            "ai_analysis": ai_analysis.dict() if ai_analysis else None,
+            "ai_analysis": ai_analysis.model_dump() if ai_analysis else None,
             "teacher_response": None,
             "reviewed_by": None,
             "reviewed_at": None,
@@ -203,10 +237,23 @@ class ExtensionService:
             "updated_at": now
         }
 
-        result = await self.collection.insert_one(extension_doc)
+        # One pending request per student and task is enforced by the
+        # uniq_extensions_pending_student_task partial index
+        try:
+            result = await self.collection.insert_one(extension_doc)
+        except DuplicateKeyError:
+            raise ValueError("Extension request already pending for this task")
         extension_doc["_id"] = result.inserted_id
 
-        return await self._build_extension_response(extension_doc)
+        # The task and validated analysis are already in hand; only the
+        # subject name and student name still need loading.
+        subject, user = await asyncio.gather(
+            self.subjects_collection.find_one({"_id": task["subject_id"]}, {"name": 1}),
+            self.users_collection.find_one(
+                {"uid": student_uid}, {"uid": 1, "display_name": 1, "email": 1}
+            ),
+        )
+        return self._build_response_from_objects(extension_doc, task, subject, user, ai_analysis)
 
     async def _generate_ai_analysis(
         self,
@@ -263,20 +310,35 @@ class ExtensionService:
 
         if teacher_uid:
             # Get subjects taught by this teacher
-            subjects = await self.subjects_collection.find({"teacher_uid": teacher_uid}).to_list(None)
-            subject_ids = [str(s["_id"]) for s in subjects]
-            query["subject_id"] = {"$in": subject_ids}
+            query["subject_id"] = {"$in": await self._subject_ids_for_teacher(teacher_uid)}
 
         if status:
             query["status"] = status
 
         extensions = await self.collection.find(query).sort("created_at", -1).limit(limit).to_list(None)
 
-        results = []
-        for ext in extensions:
-            results.append(await self._build_extension_response(ext))
-
-        return results
+        return await self._build_extension_responses_bulk(extensions)
+
+    async def _subject_ids_for_teacher(self, teacher_uid: str) -> List[str]:
+        """Subject ids (as stored on extensions) taught by a teacher, cached briefly."""
+        now = time.monotonic()
+        cached = _teacher_subjects_cache.get(teacher_uid)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        subjects = await self.subjects_collection.find(
+            {"teacher_uid": teacher_uid}, {"_id": 1}
+        ).to_list(None)
+        subject_ids = [str(s["_id"]) for s in subjects]
+        _teacher_subjects_cache[teacher_uid] = (now + _TEACHER_SUBJECTS_TTL_SECONDS, subject_ids)
+        _teacher_subjects_cache.move_to_end(teacher_uid)
+        # Entries share one TTL, so expired ones sit at the front
+        while (
+            len(_teacher_subjects_cache) > _TEACHER_SUBJECTS_MAX_TEACHERS
+            or next(iter(_teacher_subjects_cache.values()))[0] <= now
+        ):
+            _teacher_subjects_cache.popitem(last=False)
+        return subject_ids
 
     async def get_extension_by_id(self, extension_id: str) -> Optional[ExtensionRequestResponse]:
         """Get a specific extension request by ID"""
@@ -286,6 +348,50 @@ class ExtensionService:
 
         return await self._build_extension_response(extension)
 
+    async def _get_pending_for_review(self, extension_id: str, teacher_uid: str) -> dict:
+        """
+        Load a pending extension and verify the teacher owns its subject.
+
+        The extension, its task and the task's subject are joined in one
+        aggregation rather than three sequential find_one calls.
+        """
+        pipeline = [
+            {"$match": {"_id": ObjectId(extension_id)}},
+            {"$lookup": {
+                "from": "tasks",
+                "let": {"tid": "$task_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$tid"]}}},
+                    {"$project": {"subject_id": 1}},
+                ],
+                "as": "task",
+            }},
+            {"$unwind": {"path": "$task", "preserveNullAndEmptyArrays": True}},
+            {"$lookup": {
+                "from": "subjects",
+                "localField": "task.subject_id",
+                "foreignField": "_id",
+                "as": "subject",
+            }},
+            {"$unwind": {"path": "$subject", "preserveNullAndEmptyArrays": True}},
+        ]
+        cursor = await self.collection.aggregate(pipeline)
+        rows = await cursor.to_list(length=1)
+        if not rows:
+            raise ValueError("Extension request not found")
+
+        extension = rows[0]
+        if extension["status"] != "pending":
+            raise ValueError("Extension request is not pending")
+
+        # Verify teacher owns the subject
+        subject = extension.pop("subject", None)
+        extension.pop("task", None)
+        if not subject or subject.get("teacher_uid") != teacher_uid:
+            raise ValueError("Not authorized to review this extension")
+
+        return extension
+
     async def approve_extension(
         self,
         extension_id: str,
@@ -296,26 +402,16 @@ class ExtensionService:
         """
         Approve an extension request and update task deadline
         """
-        extension = await self.collection.find_one({"_id": ObjectId(extension_id)})
-        if not extension:
-            raise ValueError("Extension request not found")
-
-        if extension["status"] != "pending":
-            raise ValueError("Extension request is not pending")
-
-        # Verify teacher owns the subject
-        task = await self.tasks_collection.find_one({"_id": ObjectId(extension["task_id"])})
-        subject = await self.subjects_collection.find_one({"_id": task["subject_id"]})
-        if subject["teacher_uid"] != teacher_uid:
-            raise ValueError("Not authorized to review this extension")
+        extension = await self._get_pending_for_review(extension_id, teacher_uid)
 
         # Determine final deadline
         final_deadline = approved_deadline or extension["requested_deadline"]
 
-        # Update extension request
+        # Update extension request; the status filter keeps a concurrent
+        # review from being applied twice
         now = datetime.utcnow()
-        await self.collection.update_one(
-            {"_id": ObjectId(extension_id)},
+        updated = await self.collection.find_one_and_update(
+            {"_id": extension["_id"], "status": "pending"},
             {
                 "$set": {
                     "status": "approved",
@@ -325,18 +421,21 @@ class ExtensionService:
                     "approved_deadline": final_deadline,
                     "updated_at": now
                 }
-            }
+            },
+            return_document=ReturnDocument.AFTER,
         )
+        if updated is None:
+            raise ValueError("Extension request is not pending")
 
-        # Update task deadline
-        await self.tasks_collection.update_one(
-            {"_id": ObjectId(extension["task_id"])},
-            {"$set": {"deadline": final_deadline}}
+        # Update task deadline while the response is enriched
+        _, result = await asyncio.gather(
+            self.tasks_collection.update_one(
+                {"_id": extension["task_id"]},
+                {"$set": {"deadline": final_deadline}}
+            ),
+            self._build_extension_response(updated),
         )
-
-        # Get updated extension
-        updated = await self.collection.find_one({"_id": ObjectId(extension_id)})
-        return await self._build_extension_response(updated)
+        return result
 
     async def deny_extension(
         self,
@@ -347,23 +446,13 @@ class ExtensionService:
         """
         Deny an extension request
         """
-        extension = await self.collection.find_one({"_id": ObjectId(extension_id)})
-        if not extension:
-            raise ValueError("Extension request not found")
+        await self._get_pending_for_review(extension_id, teacher_uid)
 
-        if extension["status"] != "pending":
-            raise ValueError("Extension request is not pending")
-
-        # Verify teacher owns the subject
-        task = await self.tasks_collection.find_one({"_id": ObjectId(extension["task_id"])})
-        subject = await self.subjects_collection.find_one({"_id": task["subject_id"]})
-        if subject["teacher_uid"] != teacher_uid:
-            raise ValueError("Not authorized to review this extension")
-
-        # Update extension request
+        # Update extension request; the status filter keeps a concurrent
+        # review from being applied twice
         now = datetime.utcnow()
-        await self.collection.update_one(
-            {"_id": ObjectId(extension_id)},
+        updated = await self.collection.find_one_and_update(
+            {"_id": ObjectId(extension_id), "status": "pending"},
             {
                 "$set": {
                     "status": "denied",
@@ -372,11 +461,12 @@ class ExtensionService:
                     "reviewed_at": now,
                     "updated_at": now
                 }
-            }
+            },
+            return_document=ReturnDocument.AFTER,
         )
+        if updated is None:
+            raise ValueError("Extension request is not pending")
 
-        # Get updated extension
-        updated = await self.collection.find_one({"_id": ObjectId(extension_id)})
         return await self._build_extension_response(updated)
 
     async def get_extension_stats(self, teacher_uid: Optional[str] = None) -> ExtensionStats:
@@ -384,28 +474,33 @@ class ExtensionService:
         query = {}
 
         if teacher_uid:
-            subjects = await self.subjects_collection.find({"teacher_uid": teacher_uid}).to_list(None)
-            subject_ids = [str(s["_id"]) for s in subjects]
-            query["subject_id"] = {"$in": subject_ids}
-
-        total = await self.collection.count_documents(query)
-
-        pending = await self.collection.count_documents({**query, "status": "pending"})
-        approved = await self.collection.count_documents({**query, "status": "approved"})
-        denied = await self.collection.count_documents({**query, "status": "denied"})
+            query["subject_id"] = {"$in": await self._subject_ids_for_teacher(teacher_uid)}
+
+        # Totals, per-status counts and the approved-days sum in one pass
+        pipeline = [
+            {"$match": query},
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "pending": {"$sum": {"$cond": [{"$eq": ["$status", "pending"]}, 1, 0]}},
+                "approved": {"$sum": {"$cond": [{"$eq": ["$status", "approved"]}, 1, 0]}},
+                "denied": {"$sum": {"$cond": [{"$eq": ["$status", "denied"]}, 1, 0]}},
+                "approved_days_sum": {
+                    "$sum": {"$cond": [{"$eq": ["$status", "approved"]}, {"$ifNull": ["$extension_days", 0]}, 0]}
+                },
+            }},
+        ]
+        cursor = await self.collection.aggregate(pipeline)
+        rows = await cursor.to_list(length=1)
+        counts = rows[0] if rows else {}
+
+        total = counts.get("total", 0)
+        pending = counts.get("pending", 0)
+        approved = counts.get("approved", 0)
+        denied = counts.get("denied", 0)
 
         approval_rate = (approved / total * 100) if total > 0 else 0.0
-
-        # Calculate average extension days for approved requests
-        approved_extensions = await self.collection.find({
-            **query,
-            "status": "approved"
-        }).to_list(None)
-
-        avg_days = 0.0
-        if approved_extensions:
-            total_days = sum(ext.get("extension_days", 0) for ext in approved_extensions)
-            avg_days = total_days / len(approved_extensions)
+        avg_days = (counts.get("approved_days_sum", 0) / approved) if approved else 0.0
 
         return ExtensionStats(
             total_requests=total,
@@ -418,31 +513,80 @@ class ExtensionService:
 
     async def _build_extension_response(self, extension_doc: dict) -> ExtensionRequestResponse:
         """Build extension response with enriched data"""
-        # Get task details
-        task = await self.tasks_collection.find_one({"_id": ObjectId(extension_doc["task_id"])})
-        task_title = task.get("title", "Unknown Task") if task else "Unknown Task"
+        return (await self._build_extension_responses_bulk([extension_doc]))[0]
 
-        # Get subject details
-        subject = None
-        if task:
-            subject = await self.subjects_collection.find_one({"_id": task["subject_id"]})
+    async def _build_extension_responses_bulk(
+        self, extensions: List[dict]
+    ) -> List[ExtensionRequestResponse]:
+        """
+        Build enriched responses for several extensions with one batched
+        query each for tasks, subjects and students.
+        """
+        if not extensions:
+            return []
+
+        # Tasks and students are independent; only subjects wait on tasks
+        task_ids = list({e["task_id"] for e in extensions})
+        uids = list({e["student_uid"] for e in extensions})
+        tasks, users = await asyncio.gather(
+            self.tasks_collection.find(
+                {"_id": {"$in": task_ids}}, {"title": 1, "subject_id": 1}
+            ).to_list(None),
+            self.users_collection.find(
+                {"uid": {"$in": uids}}, {"uid": 1, "display_name": 1, "email": 1}
+            ).to_list(None),
+        )
+        tasks_by_id = {t["_id"]: t for t in tasks}
 
-        subject_name = subject.get("name", "Unknown Subject") if subject else "Unknown Subject"
+        subject_ids = list({t["subject_id"] for t in tasks if t.get("subject_id")})
+        subjects_by_id = {}
+        if subject_ids:
+            subjects = await self.subjects_collection.find(
+                {"_id": {"$in": subject_ids}}, {"name": 1}
+            ).to_list(None)
+            subjects_by_id = {s["_id"]: s for s in subjects}
 
-        # Get student details
-        user = await self.users_collection.find_one({"uid": extension_doc["student_uid"]})
-        student_name = user.get("display_name") or user.get("email") if user else None
+        users_by_uid = {u["uid"]: u for u in users}
 
-        # Parse AI analysis
-        ai_analysis = None
-        if extension_doc.get("ai_analysis"):
-            ai_analysis = ExtensionAIAnalysis(**extension_doc["ai_analysis"])
+        results = []
+        for extension_doc in extensions:
+            task = tasks_by_id.get(extension_doc["task_id"])
+            subject = subjects_by_id.get(task.get("subject_id")) if task else None
+
+            # Stored analyses were validated before insert
+            ai_analysis = None
+            if extension_doc.get("ai_analysis"):
+                ai_analysis = ExtensionAIAnalysis.model_construct(**extension_doc["ai_analysis"])
+
+            results.append(self._build_response_from_objects(
+                extension_doc, task, subject, users_by_uid.get(extension_doc["student_uid"]), ai_analysis
+            ))
+
+        return results
+
+    @staticmethod
+    def _build_response_from_objects(
+        extension_doc: dict,
+        task: Optional[dict],
+        subject: Optional[dict],
+        user: Optional[dict],
+        ai_analysis: Optional[ExtensionAIAnalysis],
+    ) -> ExtensionRequestResponse:
+        """
+        Build a response from already-loaded related documents.
+
+        Everything here comes from Mongo or from already-validated models,
+        so validation is skipped.
+        """
+        task_title = task.get("title", "Unknown Task") if task else "Unknown Task"
+        subject_name = subject.get("name", "Unknown Subject") if subject else "Unknown Subject"
+        student_name = user.get("display_name") or user.get("email") if user else None
 
-        return ExtensionRequestResponse(
+        return ExtensionRequestResponse.model_construct(
             id=str(extension_doc["_id"]),
             student_uid=extension_doc["student_uid"],
             student_name=student_name,
-            task_id=extension_doc["task_id"],
+            task_id=str(extension_doc["task_id"]),
             task_title=task_title,
             subject_id=extension_doc.get("subject_id"),
             subject_name=subject_name,
@@ -5,18 +5,27 @@ Centralized service for all Groq API interactions with rate limiting and caching
 
 import asyncio
 import hashlib
-import json
+import heapq
 import logging
 import re
-from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Any
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Optional, Dict, List, Any, Tuple, Union
 from functools import wraps
 
-from groq import Groq, APIError, RateLimitError, APIConnectionError
+import orjson
 from app.config import settings
 
+if TYPE_CHECKING:
+    from groq import AsyncGroq
+
 logger = logging.getLogger(__name__)
 
+_CACHE_MAX_ENTRIES = 10_000
+_BREAKER_COOLDOWN_SECONDS = 30
+
 
 class GroqServiceError(Exception):
     """Custom exception for Groq service errors"""
@@ -28,40 +37,86 @@ class RateLimitExceeded(Exception):
     pass
 
 
+class _GroqSDKNotLoaded(Exception):
+    """Stands in for the groq SDK's error classes when the SDK isn't imported"""
+    pass
+
+
 class InMemoryCache:
-    """Simple in-memory cache with TTL support"""
+    """
+    Simple in-memory cache with TTL support (monotonic clock, thread-safe).
+    Holds at most max_entries; past that the least recently used entry goes.
+    """
 
-    def __init__(self):
-        self._cache: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, max_entries: int = _CACHE_MAX_ENTRIES):
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._max_entries = max_entries
+        # (expires_at, key) min-heap so clear_expired only touches expired
+        # entries. Overwrites and deletes leave stale heap entries behind;
+        # they are skipped on pop and compacted once they dominate the heap.
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._stale_heap_entries = 0
+        self._lock = threading.Lock()
 
     def get(self, key: str) -> Optional[str]:
         """Get value from cache if not expired"""
-        if key in self._cache:
-            entry = self._cache[key]
-            if datetime.utcnow() < entry["expires_at"]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() < entry["expires_at"]:
+                self._cache.move_to_end(key)
                 return entry["value"]
-            else:
-                del self._cache[key]
-        return None
+            self._remove(key)
+            return None
 
     def set(self, key: str, value: str, ttl_seconds: int = 3600):
         """Set value in cache with TTL"""
-        self._cache[key] = {
-            "value": value,
-            "expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds)
-        }
+        expires_at = time.monotonic() + ttl_seconds
+        with self._lock:
+            if key in self._cache:
+                self._stale_heap_entries += 1
+            self._cache[key] = {
+                "value": value,
+                "expires_at": expires_at
+            }
+            self._cache.move_to_end(key)
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            while len(self._cache) > self._max_entries:
+                self._cache.popitem(last=False)
+                self._stale_heap_entries += 1
+            self._maybe_compact_heap()
 
     def delete(self, key: str):
         """Delete key from cache"""
-        if key in self._cache:
-            del self._cache[key]
+        with self._lock:
+            self._remove(key)
 
     def clear_expired(self):
         """Remove all expired entries"""
-        now = datetime.utcnow()
-        expired_keys = [k for k, v in self._cache.items() if now >= v["expires_at"]]
-        for key in expired_keys:
-            del self._cache[key]
+        now = time.monotonic()
+        with self._lock:
+            cache = self._cache
+            heap = self._expiry_heap
+            while heap and heap[0][0] <= now:
+                expires_at, key = heapq.heappop(heap)
+                entry = cache.get(key)
+                if entry is not None and entry["expires_at"] == expires_at:
+                    cache.pop(key)
+                else:
+                    self._stale_heap_entries -= 1
+
+    def _remove(self, key: str):
+        # Caller holds self._lock
+        if self._cache.pop(key, None) is not None:
+            self._stale_heap_entries += 1
+            self._maybe_compact_heap()
+
+    def _maybe_compact_heap(self):
+        if self._stale_heap_entries > len(self._expiry_heap) // 2:
+            self._expiry_heap = [(entry["expires_at"], key) for key, entry in self._cache.items()]
+            heapq.heapify(self._expiry_heap)
+            self._stale_heap_entries = 0
 
 
 class RateLimiter:
@@ -78,59 +133,49 @@ class RateLimiter:
             "test_generation": {"max": 50, "window": 3600},   # 50/hour
             "task_extraction": {"max": 50, "window": 3600}    # 50/hour
         }
-        # Track usage: {user_uid: {feature: [(timestamp, ...)]}}
-        self._usage: Dict[str, Dict[str, List[datetime]]] = {}
-
-    def check_limit(self, user_uid: str, feature: str) -> bool:
-        """Check if user is within rate limit for feature"""
+        # Bucket per user/feature: {user_uid: {feature: {"tokens", "last_refill"}}}.
+        # Each bucket holds up to "max" calls and refills at max/window per
+        # second, so checks are O(1) instead of filtering timestamp lists.
+        self._usage: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, user_uid: str, feature: str) -> Dict[str, float]:
+        """Get the user's bucket for a feature, refilled up to now"""
+        # Caller holds self._lock
+        limit_config = self.limits[feature]
+        capacity = float(limit_config["max"])
+        now = time.monotonic()
+
+        buckets = self._usage.setdefault(user_uid, {})
+        state = buckets.get(feature)
+        if state is None:
+            state = buckets[feature] = {"tokens": capacity, "last_refill": now}
+            return state
+
+        elapsed = now - state["last_refill"]
+        refill_rate = capacity / limit_config["window"]
+        state["tokens"] = min(capacity, state["tokens"] + elapsed * refill_rate)
+        state["last_refill"] = now
+        return state
+
+    def try_acquire(self, user_uid: str, feature: str) -> bool:
+        """Take one call from the user's bucket if one is available"""
         if feature not in self.limits:
             return True
+        with self._lock:
+            state = self._bucket(user_uid, feature)
+            if state["tokens"] < 1.0:
+                return False
+            state["tokens"] -= 1.0
+            return True
 
-        limit_config = self.limits[feature]
-        window_start = datetime.utcnow() - timedelta(seconds=limit_config["window"])
-
-        # Initialize user tracking
-        if user_uid not in self._usage:
-            self._usage[user_uid] = {}
-        if feature not in self._usage[user_uid]:
-            self._usage[user_uid][feature] = []
-
-        # Clean old entries
-        self._usage[user_uid][feature] = [
-            ts for ts in self._usage[user_uid][feature]
-            if ts > window_start
-        ]
-
-        # Check limit
-        return len(self._usage[user_uid][feature]) < limit_config["max"]
-
-    def record_usage(self, user_uid: str, feature: str):
-        """Record a usage event"""
-        if user_uid not in self._usage:
-            self._usage[user_uid] = {}
-        if feature not in self._usage[user_uid]:
-            self._usage[user_uid][feature] = []
-
-        self._usage[user_uid][feature].append(datetime.utcnow())
-
-    def get_remaining(self, user_uid: str, feature: str) -> int:
-        """Get remaining calls for user/feature"""
+    def release(self, user_uid: str, feature: str):
+        """Return a call taken by try_acquire that did not reach a response"""
         if feature not in self.limits:
-            return -1  # Unlimited
-
-        limit_config = self.limits[feature]
-        window_start = datetime.utcnow() - timedelta(seconds=limit_config["window"])
-
-        if user_uid not in self._usage or feature not in self._usage[user_uid]:
-            return limit_config["max"]
-
-        # Count recent calls
-        recent_calls = len([
-            ts for ts in self._usage[user_uid][feature]
-            if ts > window_start
-        ])
-
-        return max(0, limit_config["max"] - recent_calls)
+            return
+        with self._lock:
+            state = self._bucket(user_uid, feature)
+            state["tokens"] = min(float(self.limits[feature]["max"]), state["tokens"] + 1.0)
 
 
 class RoleQuotaLimiter:
@@ -176,8 +221,8 @@ class RoleQuotaLimiter:
             },
         }
 
-        now = datetime.utcnow()
-        self._buckets: Dict[str, Dict[str, float | datetime]] = {
+        now = time.monotonic()
+        self._buckets: Dict[str, Dict[str, float]] = {
             "teacher": {
                 "minute_tokens": float(self._limits["teacher"]["rpm"]),
                 "minute_last": now,
@@ -219,9 +264,8 @@ class RoleQuotaLimiter:
         if capacity <= 0:
             return
         bucket = self._buckets[r]
-        now = datetime.utcnow()
-        last = bucket["minute_last"]
-        elapsed = max(0.0, (now - last).total_seconds())
+        now = time.monotonic()
+        elapsed = max(0.0, now - bucket["minute_last"])
         refill_rate = capacity / 60.0
         bucket["minute_tokens"] = min(capacity, float(bucket["minute_tokens"]) + elapsed * refill_rate)
         bucket["minute_last"] = now
@@ -232,9 +276,8 @@ class RoleQuotaLimiter:
         if capacity <= 0:
             return
         bucket = self._buckets[r]
-        now = datetime.utcnow()
-        last = bucket["day_last"]
-        elapsed = max(0.0, (now - last).total_seconds())
+        now = time.monotonic()
+        elapsed = max(0.0, now - bucket["day_last"])
         refill_rate = capacity / 86400.0
         bucket["day_tokens"] = min(capacity, float(bucket["day_tokens"]) + elapsed * refill_rate)
         bucket["day_last"] = now
@@ -255,6 +298,151 @@ class RoleQuotaLimiter:
         bucket["day_tokens"] = max(0.0, float(bucket["day_tokens"]) - 1.0)
 
 
+class FairConcurrencyLimiter:
+    """
+    Bounds in-flight Groq calls and hands freed slots to waiting users in
+    round-robin order, so one user's burst cannot starve everyone else.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self._capacity = max(1, int(max_concurrency))
+        self._active = 0
+        # user_uid -> that user's waiters; the first user is served next
+        self._waiters: "OrderedDict[str, deque[asyncio.Future]]" = OrderedDict()
+
+    @asynccontextmanager
+    async def slot(self, user_uid: str):
+        await self._acquire(user_uid)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, user_uid: str):
+        if self._active < self._capacity and not self._waiters:
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_uid, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was handed over just before cancellation; pass it on
+                self._release()
+            else:
+                queue = self._waiters.get(user_uid)
+                if queue is not None and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self._waiters[user_uid]
+            raise
+
+    def _release(self):
+        while self._waiters:
+            user_uid, queue = self._waiters.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                self._waiters[user_uid] = queue  # back of the rotation
+            if not future.done():
+                future.set_result(None)  # slot moves to the waiter
+                return
+        self._active -= 1
+
+
+# System prompts for the feature methods below
+_SYSTEM_PROMPT_CODE_FEEDBACK = "You are a coding instructor providing feedback on student code. Be constructive, specific, and encouraging."
+_SYSTEM_PROMPT_DOC_ANALYSIS = "You are an academic writing evaluator. Always respond with valid JSON."
+_SYSTEM_PROMPT_TEST_CASES = "You are a QA engineer generating test cases. Output valid JSON only."
+_SYSTEM_PROMPT_TASK_EXTRACTION = "You are a project manager extracting tasks from documents. Output valid JSON only."
+
+_SYSTEM_PROMPT_PROJECT_ANALYSIS = """You are an expert educational evaluator with expertise in:
+- Academic research assessment
+- Technical project evaluation
+- Writing quality analysis
+- Adaptive grading frameworks
+
+Always respond with valid JSON. Be fair, thorough, and constructive."""
+
+_SYSTEM_PROMPT_QUIZ = """You are an expert educational assessment designer.
+Create high-quality multiple-choice questions that:
+- Test comprehension and application, not just recall
+- Have clear, unambiguous correct answers
+- Include plausible distractors
+- Are appropriately challenging
+Always output valid JSON array only."""
+
+
+# User prompt templates, filled with str.format
+_CODE_FEEDBACK_TEMPLATE = """TASK: {task}
+LANGUAGE: {language}
+CODE:
+```{language}
+{code}
+```
+
+TEST RESULTS:
+- Passed: {passed}/{total}
+{test_results}
+
+SECURITY ISSUES: {security}
+
+Provide constructive feedback in 2-3 paragraphs:
+1. What the student did well
+2. Why specific tests failed (be specific about the logic error)
+3. One concrete suggestion for improvement
+
+Keep response under 300 words. Be encouraging but specific."""
+
+_DOC_ANALYSIS_TEMPLATE = """ASSIGNMENT: {title}
+REQUIREMENTS: {requirements}
+MINIMUM WORDS: {min_words}
+
+SUBMISSION PREVIEW:
+"{content}"
+
+METRICS:
+- Word count: {word_count}
+- Found keywords: {found}
+- Missing keywords: {missing}
+- Readability: Grade level {grade_level}
+
+Evaluate this submission and provide your response in the following JSON format:
+{{
+  "quality_assessment": "Brief assessment of content quality",
+  "structure_feedback": "Feedback on organization and flow",
+  "improvements": ["improvement 1", "improvement 2"],
+  "suggested_score": 75
+}}
+
+Be constructive and specific. The score should be 0-100."""
+
+
+def _trunc(value: Any, limit: int) -> str:
+    """Coerce a prompt field to str and cap it at limit characters"""
+    text = value if isinstance(value, str) else str(value)
+    return text if len(text) <= limit else text[:limit]
+
+
+def _fallback_text(fallback: Union[str, dict, list]) -> str:
+    """safe_call fallbacks may be structured; encode them only when used"""
+    return fallback if isinstance(fallback, str) else orjson.dumps(fallback).decode()
+
+
+def _doc_analysis_fallback(word_count: int, min_words: int, missing_keywords: List[str]) -> dict:
+    """Rule-based analyze_document result used when Groq is unavailable"""
+    return {
+        "quality_assessment": "Document meets basic requirements.",
+        "structure_feedback": f"Word count: {word_count}. {'Meets' if word_count >= min_words else 'Below'} minimum requirement.",
+        "improvements": [
+            f"Include missing keywords: {', '.join(missing_keywords)}" if missing_keywords else "Good keyword coverage"
+        ],
+        "suggested_score": 70 if word_count >= min_words and not missing_keywords else 50,
+        "raw_response": "Fallback response - Groq unavailable"
+    }
+
+
 class GroqService:
     """
     Centralized Groq AI service with:
@@ -290,12 +478,29 @@ class GroqService:
             teacher_count=settings.groq_teacher_count,
             student_count=settings.groq_student_count,
         )
+        # Monotonic time until which safe_call skips Groq (see _open_breaker)
+        self._breaker_open_until = 0.0
+        # Caps in-flight Groq requests, shared fairly between users
+        self._concurrency = FairConcurrencyLimiter(settings.groq_max_concurrency)
         self._initialized = True
 
+        # The groq SDK (httpx, pydantic models) is only imported when a key is
+        # configured, so fallback-only deployments skip its import cost. Its
+        # error classes are bound here for _call_groq's except clauses.
+        self._RateLimitError = self._APIConnectionError = _GroqSDKNotLoaded
+        self._APIError = self._InternalServerError = _GroqSDKNotLoaded
+        if settings.groq_api_key or settings.groq_grading_api_key:
+            from groq import AsyncGroq, APIError, APIConnectionError, InternalServerError, RateLimitError
+
+            self._RateLimitError = RateLimitError
+            self._APIConnectionError = APIConnectionError
+            self._APIError = APIError
+            self._InternalServerError = InternalServerError
+
         # Initialize Groq client if API key is available
         if settings.groq_api_key:
             try:
-                self.client = Groq(api_key=settings.groq_api_key)
+                self.client = AsyncGroq(api_key=settings.groq_api_key)
                 logger.info("✅ Groq client initialized successfully")
             except Exception as e:
                 logger.error(f"❌ Failed to initialize Groq client: {e}")
@@ -305,7 +510,7 @@ class GroqService:
         # Initialize Groq grading client if API key is available
         if settings.groq_grading_api_key:
             try:
-                self.grading_client = Groq(api_key=settings.groq_grading_api_key)
+                self.grading_client = AsyncGroq(api_key=settings.groq_grading_api_key)
                 logger.info("✅ Groq grading client initialized successfully")
             except Exception as e:
                 logger.error(f"❌ Failed to initialize Groq grading client: {e}")
@@ -316,9 +521,16 @@ class GroqService:
 
     def _generate_cache_key(self, feature: str, data: dict) -> str:
         """Generate a cache key from feature and data"""
-        data_str = json.dumps(data, sort_keys=True)
-        hash_str = hashlib.md5(data_str.encode()).hexdigest()
-        return f"groq:{feature}:{hash_str}"
+        # Feed fields straight into the hash rather than building a sorted
+        # JSON string of the (often multi-KB) prompt first
+        h = hashlib.blake2b(digest_size=16)
+        for key in sorted(data):
+            value = data[key]
+            h.update(key.encode())
+            h.update(b"\x00")
+            h.update(value.encode() if isinstance(value, str) else orjson.dumps(value, option=orjson.OPT_SORT_KEYS))
+            h.update(b"\x01")
+        return f"groq:{feature}:{h.hexdigest()}"
 
     async def _call_groq(
         self,
@@ -326,7 +538,8 @@ class GroqService:
         system_prompt: str = "",
         max_tokens: int = 1000,
         temperature: float = 0.7,
-        client: Optional[Groq] = None
+        client: Optional["AsyncGroq"] = None,
+        user_uid: str = ""
     ) -> str:
         """
         Make an async call to Groq API
@@ -337,6 +550,7 @@ class GroqService:
             max_tokens: Maximum tokens in response
             temperature: Creativity parameter (0-1)
             client: Optional Groq client instance (defaults to self.client)
+            user_uid: Caller to queue under when all Groq slots are busy
 
         Returns:
             Response text from Groq
@@ -351,31 +565,34 @@ class GroqService:
         messages.append({"role": "user", "content": prompt})
 
         try:
-            # Run sync client in executor for async compatibility
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: active_client.chat.completions.create(
+            async with self._concurrency.slot(user_uid):
+                response = await active_client.chat.completions.create(
                     model=self.model,
                     messages=messages,
                     max_tokens=max_tokens,
                     temperature=temperature
                 )
-            )
             return response.choices[0].message.content
 
-        except RateLimitError as e:
+        except self._RateLimitError as e:
             logger.warning(f"Groq rate limit hit: {e}")
             raise GroqServiceError("AI service rate limit exceeded. Please try again later.")
 
-        except APIConnectionError as e:
+        except self._APIConnectionError as e:
             logger.error(f"Groq connection error: {e}")
+            self._open_breaker()
             raise GroqServiceError("Unable to connect to AI service.")
 
-        except APIError as e:
+        except self._APIError as e:
             logger.error(f"Groq API error: {e}")
+            if isinstance(e, self._InternalServerError):
+                self._open_breaker()
             raise GroqServiceError(f"AI service error: {str(e)}")
 
+    def _open_breaker(self):
+        """Serve fallbacks without calling Groq for a short cooldown after an outage error"""
+        self._breaker_open_until = time.monotonic() + _BREAKER_COOLDOWN_SECONDS
+
     async def safe_call(
         self,
         feature: str,
@@ -383,7 +600,7 @@ class GroqService:
         prompt: str,
         role: str = "student",
         system_prompt: str = "",
-        fallback: str = "Unable to generate AI response.",
+        fallback: Union[str, dict, list] = "Unable to generate AI response.",
         use_cache: bool = True,
         cache_ttl: int = None,
         max_tokens: int = 1000,
@@ -398,7 +615,8 @@ class GroqService:
             user_uid: User ID for rate limiting
             prompt: The prompt to send
             system_prompt: System prompt
-            fallback: Fallback response if Groq fails
+            fallback: Fallback response if Groq fails; dicts/lists are
+                JSON-encoded only when the fallback is actually returned
             use_cache: Whether to use caching
             cache_ttl: Cache TTL in seconds (default from settings)
             max_tokens: Max response tokens
@@ -414,17 +632,15 @@ class GroqService:
         # Check if Groq is available
         if not client:
             logger.debug(f"Groq client not available, using fallback for {feature}")
-            return fallback
+            return _fallback_text(fallback)
 
-        # Check rate limit
-        if not self.rate_limiter.check_limit(user_uid, feature):
-            # remaining = self.rate_limiter.get_remaining(user_uid, feature)
-            logger.warning(f"Rate limit exceeded for user {user_uid} on {feature}")
-            raise RateLimitExceeded(
-                f"Rate limit exceeded for {feature}. Please wait before trying again."
-            )
+        # Groq recently failed with a connection/server error; don't queue
+        # more calls behind it until the cooldown passes
+        if time.monotonic() < self._breaker_open_until:
+            logger.debug(f"Groq circuit open, using fallback for {feature}")
+            return _fallback_text(fallback)
 
-        # Check cache
+        # Check cache; cached responses don't count against the rate limit
         if use_cache and settings.groq_enable_caching:
             cache_key = self._generate_cache_key(feature, {"prompt": prompt})
             cached_response = self.cache.get(cache_key)
@@ -432,21 +648,34 @@ class GroqService:
                 logger.debug(f"Cache hit for {feature}")
                 return cached_response
 
-        try:
-            if not self.role_quota_limiter.check_limit(role):
-                raise RateLimitExceeded("Global Groq quota exceeded for your role. Please try again later.")
+        # Global role quota first, so a rejection here doesn't spend the
+        # user's per-feature budget
+        if not self.role_quota_limiter.check_limit(role):
+            raise RateLimitExceeded("Global Groq quota exceeded for your role. Please try again later.")
+
+        # Check rate limit; the call is charged here, so concurrent requests
+        # can't all pass the check before any of them records usage. Calls
+        # that fail or are cancelled are refunded below.
+        if not self.rate_limiter.try_acquire(user_uid, feature):
+            logger.warning(f"Rate limit exceeded for user {user_uid} on {feature}")
+            raise RateLimitExceeded(
+                f"Rate limit exceeded for {feature}. Please wait before trying again."
+            )
 
+        succeeded = False
+        try:
             # Make the API call
             response = await self._call_groq(
                 prompt=prompt,
                 system_prompt=system_prompt,
                 max_tokens=max_tokens,
                 temperature=temperature,
-                client=client
+                client=client,
+                user_uid=user_uid
             )
+            succeeded = True
 
             # Record usage
-            self.rate_limiter.record_usage(user_uid, feature)
             self.role_quota_limiter.record_usage(role)
 
             # Cache response
@@ -456,11 +685,15 @@ class GroqService:
 
             return response
 
-        except (GroqServiceError, RateLimitExceeded):
+        except GroqServiceError:
             raise
         except Exception as e:
             logger.error(f"Unexpected error in Groq call: {e}")
-            return fallback
+            return _fallback_text(fallback)
+        finally:
+            # Also covers CancelledError when the client goes away mid-call
+            if not succeeded:
+                self.rate_limiter.release(user_uid, feature)
 
     # ========================================
     # Feature-Specific Methods
@@ -480,56 +713,46 @@ class GroqService:
         Uses the grading API key if available.
         """
         # Preprocess data
-        code_snippet = code[:2000] if len(code) > 2000 else code
+        code_snippet = _trunc(code, 2000)
         passed_count = sum(1 for t in test_results if t.get("passed", False))
         total_count = len(test_results)
 
         # Format test results
-        test_results_formatted = ""
+        parts = []
         for i, result in enumerate(test_results[:5]):  # Limit to first 5
             status = "✓ PASSED" if result.get("passed") else "✗ FAILED"
-            test_results_formatted += f"\nTest {i+1}: {status}"
+            parts.append(f"\nTest {i+1}: {status}")
             if not result.get("passed"):
-                test_results_formatted += f"\n  Input: {result.get('input', 'N/A')[:50]}"
-                test_results_formatted += f"\n  Expected: {result.get('expected', 'N/A')[:50]}"
-                test_results_formatted += f"\n  Got: {result.get('actual', 'N/A')[:50]}"
+                parts.append(f"\n  Input: {_trunc(result.get('input', 'N/A'), 50)}")
+                parts.append(f"\n  Expected: {_trunc(result.get('expected', 'N/A'), 50)}")
+                parts.append(f"\n  Got: {_trunc(result.get('actual', 'N/A'), 50)}")
                 if result.get("error"):
-                    test_results_formatted += f"\n  Error: {result.get('error')[:100]}"
+                    parts.append(f"\n  Error: {_trunc(result['error'], 100)}")
+        test_results_formatted = "".join(parts)
 
         security_str = ", ".join(security_issues) if security_issues else "None detected"
 
-        prompt = f"""TASK: {task_description[:500]}
-LANGUAGE: {language}
-CODE:
-```{language}
-{code_snippet}
-```
-
-TEST RESULTS:
-- Passed: {passed_count}/{total_count}
-{test_results_formatted}
-
-SECURITY ISSUES: {security_str}
-
-Provide constructive feedback in 2-3 paragraphs:
-1. What the student did well
-2. Why specific tests failed (be specific about the logic error)
-3. One concrete suggestion for improvement
-
-Keep response under 300 words. Be encouraging but specific."""
-
-        system_prompt = "You are a coding instructor providing feedback on student code. Be constructive, specific, and encouraging."
+        prompt = _CODE_FEEDBACK_TEMPLATE.format(
+            task=_trunc(task_description, 500),
+            language=language,
+            code=code_snippet,
+            passed=passed_count,
+            total=total_count,
+            test_results=test_results_formatted,
+            security=security_str,
+        )
 
-        fallback = f"Passed {passed_count}/{total_count} test cases. "
+        fallback_parts = [f"Passed {passed_count}/{total_count} test cases. "]
         if security_issues:
-            fallback += f"Security warning: {', '.join(security_issues)}. "
-        fallback += "Review failed test cases and check your logic."
+            fallback_parts.append(f"Security warning: {', '.join(security_issues)}. ")
+        fallback_parts.append("Review failed test cases and check your logic.")
+        fallback = "".join(fallback_parts)
 
         return await self.safe_call(
             feature="code_feedback",
             user_uid=user_uid,
             prompt=prompt,
-            system_prompt=system_prompt,
+            system_prompt=_SYSTEM_PROMPT_CODE_FEEDBACK,
             fallback=fallback,
             use_cache=False,  # Don't cache code feedback
             max_tokens=500,
@@ -554,50 +777,28 @@ Keep response under 300 words. Be encouraging but specific."""
         Analyze document submission with Groq
         Uses grading API key if available.
         """
-        content_preview = content[:3000] if len(content) > 3000 else content
-
-        prompt = f"""ASSIGNMENT: {task_title}
-REQUIREMENTS: {task_description[:500]}
-MINIMUM WORDS: {min_words}
-
-SUBMISSION PREVIEW:
-"{content_preview}"
-
-METRICS:
-- Word count: {word_count}
-- Found keywords: {', '.join(found_keywords) if found_keywords else 'None'}
-- Missing keywords: {', '.join(missing_keywords) if missing_keywords else 'None'}
-- Readability: Grade level {readability.get('grade_level', 'N/A')}
-
-Evaluate this submission and provide your response in the following JSON format:
-{{
-  "quality_assessment": "Brief assessment of content quality",
-  "structure_feedback": "Feedback on organization and flow",
-  "improvements": ["improvement 1", "improvement 2"],
-  "suggested_score": 75
-}}
-
-Be constructive and specific. The score should be 0-100."""
-
-        system_prompt = "You are an academic writing evaluator. Always respond with valid JSON."
+        content_preview = _trunc(content, 3000)
+
+        prompt = _DOC_ANALYSIS_TEMPLATE.format(
+            title=task_title,
+            requirements=_trunc(task_description, 500),
+            min_words=min_words,
+            content=content_preview,
+            word_count=word_count,
+            found=', '.join(found_keywords) if found_keywords else 'None',
+            missing=', '.join(missing_keywords) if missing_keywords else 'None',
+            grade_level=readability.get('grade_level', 'N/A'),
+        )
 
-        fallback_response = {
-            "quality_assessment": "Document meets basic requirements.",
-            "structure_feedback": f"Word count: {word_count}. {'Meets' if word_count >= min_words else 'Below'} minimum requirement.",
-            "improvements": [
-                f"Include missing keywords: {', '.join(missing_keywords)}" if missing_keywords else "Good keyword coverage"
-            ],
-            "suggested_score": 70 if word_count >= min_words and not missing_keywords else 50,
-            "raw_response": "Fallback response - Groq unavailable"
-        }
+        fallback_response = _doc_analysis_fallback(word_count, min_words, missing_keywords)
 
         try:
             response = await self.safe_call(
                 feature="doc_analysis",
                 user_uid=user_uid,
                 prompt=prompt,
-                system_prompt=system_prompt,
-                fallback=json.dumps(fallback_response),
+                system_prompt=_SYSTEM_PROMPT_DOC_ANALYSIS,
+                fallback=fallback_response,
                 use_cache=False,
                 max_tokens=600,
                 temperature=0.5,
@@ -612,8 +813,8 @@ Be constructive and specific. The score should be 0-100."""
                 response = response[:-3]
             response = response.strip()
             
-            return json.loads(response)
-        except json.JSONDecodeError:
+            return orjson.loads(response)
+        except orjson.JSONDecodeError:
             logger.error(f"Failed to decode Groq JSON response: {response}")
             return fallback_response
         except Exception as e:
@@ -630,7 +831,7 @@ Be constructive and specific. The score should be 0-100."""
         """
         Auto generate test cases from code
         """
-        code_snippet = code[:3000]
+        code_snippet = _trunc(code, 3000)
 
         prompt = f"""Generate {num_tests} test cases for the following {language} code.
 The code is:
@@ -648,7 +849,6 @@ Example:
 If the function takes no arguments, input can be empty string or relevant setup.
 Ensure inputs cover edge cases.
 """
-        system_prompt = "You are a QA engineer generating test cases. Output valid JSON only."
         
         fallback = []
 
@@ -657,7 +857,7 @@ Ensure inputs cover edge cases.
                 feature="test_generation",
                 user_uid=user_uid,
                 prompt=prompt,
-                system_prompt=system_prompt,
+                system_prompt=_SYSTEM_PROMPT_TEST_CASES,
                 fallback="[]",
                 use_cache=True,
                 max_tokens=1000,
@@ -671,7 +871,7 @@ Ensure inputs cover edge cases.
                 response = response[:-3]
             response = response.strip()
             
-            return json.loads(response)
+            return orjson.loads(response)
         except Exception as e:
             logger.error(f"Error generating test cases: {e}")
             return fallback
@@ -684,7 +884,7 @@ Ensure inputs cover edge cases.
         """
         Auto create tasks from document content
         """
-        content_preview = content[:4000]
+        content_preview = _trunc(content, 4000)
 
         prompt = f"""Analyze the following document and extract actionable tasks.
 Document content:
@@ -701,7 +901,6 @@ Example:
   {{"title": "Review Chapter 1", "description": "Read and summarize chapter 1", "priority": "high", "estimated_minutes": 60}}
 ]
 """
-        system_prompt = "You are a project manager extracting tasks from documents. Output valid JSON only."
         
         fallback = []
 
@@ -710,7 +909,7 @@ Example:
                 feature="task_extraction",
                 user_uid=user_uid,
                 prompt=prompt,
-                system_prompt=system_prompt,
+                system_prompt=_SYSTEM_PROMPT_TASK_EXTRACTION,
                 fallback="[]",
                 use_cache=True,
                 max_tokens=1000,
@@ -724,7 +923,7 @@ Example:
                 response = response[:-3]
             response = response.strip()
             
-            return json.loads(response)
+            return orjson.loads(response)
         except Exception as e:
             logger.error(f"Error extracting tasks: {e}")
             return fallback
@@ -757,7 +956,7 @@ Example:
         Returns:
             Dict with category_scores, overall_score, feedback, and analysis_framework_used
         """
-        content_preview = content[:5000] if len(content) > 5000 else content
+        content_preview = _trunc(content, 5000)
 
         prompt = f"""TASK: {task_title}
 REQUIREMENTS: {task_description}
@@ -802,14 +1001,6 @@ Respond in this EXACT JSON format:
 
 Be thorough and constructive. All scores 0-100."""
 
-        system_prompt = """You are an expert educational evaluator with expertise in:
-- Academic research assessment
-- Technical project evaluation
-- Writing quality analysis
-- Adaptive grading frameworks
-
-Always respond with valid JSON. Be fair, thorough, and constructive."""
-
         fallback_response = {
             "framework_used": "GENERAL",
             "categories": {
@@ -829,8 +1020,8 @@ Always respond with valid JSON. Be fair, thorough, and constructive."""
                 feature="doc_analysis",
                 user_uid=user_uid,
                 prompt=prompt,
-                system_prompt=system_prompt,
-                fallback=json.dumps(fallback_response),
+                system_prompt=_SYSTEM_PROMPT_PROJECT_ANALYSIS,
+                fallback=fallback_response,
                 use_cache=False,
                 max_tokens=1500,
                 temperature=0.4,
@@ -845,11 +1036,11 @@ Always respond with valid JSON. Be fair, thorough, and constructive."""
                 response = response[:-3]
             response = response.strip()
 
-            result = json.loads(response)
+            result = orjson.loads(response)
             result["raw_response"] = response
             return result
 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Failed to decode Groq JSON response for project analysis: {e}")
             logger.error(f"Response was: {response}")
             return fallback_response
@@ -883,7 +1074,7 @@ Always respond with valid JSON. Be fair, thorough, and constructive."""
             }
         """
         # Limit content size for API call
-        content_preview = document_content[:8000] if len(document_content) > 8000 else document_content
+        content_preview = _trunc(document_content, 8000)
 
         # Ensure num_questions is within bounds
         num_questions = max(5, min(50, num_questions))
@@ -921,14 +1112,6 @@ Respond in this EXACT JSON format (array of {num_questions} questions):
 
 Ensure all {num_questions} questions are unique and relevant to the topic."""
 
-        system_prompt = """You are an expert educational assessment designer.
-Create high-quality multiple-choice questions that:
-- Test comprehension and application, not just recall
-- Have clear, unambiguous correct answers
-- Include plausible distractors
-- Are appropriately challenging
-Always output valid JSON array only."""
-
         fallback = []
 
         try:
@@ -936,7 +1119,7 @@ Always output valid JSON array only."""
                 feature="test_generation",
                 user_uid=user_uid,
                 prompt=prompt,
-                system_prompt=system_prompt,
+                system_prompt=_SYSTEM_PROMPT_QUIZ,
                 fallback="[]",
                 use_cache=True,  # Cache quiz generation to reduce costs
                 cache_ttl=7200,  # 2 hours
@@ -953,7 +1136,7 @@ Always output valid JSON array only."""
                 response = response[:-3]
             response = response.strip()
 
-            questions = json.loads(response)
+            questions = orjson.loads(response)
 
             # Validate structure
             if not isinstance(questions, list):
@@ -975,7 +1158,7 @@ Always output valid JSON array only."""
 
             return valid_questions[:num_questions]  # Ensure we don't return more than requested
 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Failed to decode quiz questions JSON: {e}")
             return fallback
         except Exception as e:
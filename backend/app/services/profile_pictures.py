@@ -8,7 +8,7 @@ from typing import Any, AsyncIterator
 
 from bson import ObjectId
 from fastapi import HTTPException, status, UploadFile
-from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from gridfs import AsyncGridFSBucket
 
 from app.config import settings
 from app.database.connection import get_db
@@ -45,8 +45,8 @@ def _validate_image_bytes(content_type: str, data: bytes) -> None:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid WEBP file")
 
 
-def _gridfs_bucket(bucket_name: str) -> AsyncIOMotorGridFSBucket:
-    return AsyncIOMotorGridFSBucket(get_db(), bucket_name=bucket_name)
+def _gridfs_bucket(bucket_name: str) -> AsyncGridFSBucket:
+    return AsyncGridFSBucket(get_db(), bucket_name=bucket_name)
 
 
 async def _read_upload_file(file: UploadFile) -> tuple[bytes, str, str]:
@@ -11,7 +11,11 @@ from app.ai.evaluator.code_runner import run_code_tests
 from app.ai.evaluator.doc_analyzer import analyze_text, extract_text_from_pdf
 from app.ai.evaluator.report_gen import build_ai_feedback
 from app.database.collections import get_collection
-from app.models.submission import SubmissionEvaluation
+from app.models.submission import (
+    SubmissionAttachmentResponse,
+    SubmissionEvaluation,
+    SubmissionResponse,
+)
 from app.services.groq_service import GroqService
 
 
@@ -20,6 +24,38 @@ def _normalize_evaluation_config(task: dict) -> dict[str, Any]:
     return cfg if isinstance(cfg, dict) else {}
 
 
+def serialize_submission(doc: dict) -> SubmissionResponse:
+    raw_attachments = doc.get("attachments") or []
+    attachments: list[SubmissionAttachmentResponse] = []
+    for a in raw_attachments:
+        if not isinstance(a, dict):
+            continue
+        attachments.append(
+            SubmissionAttachmentResponse.model_construct(
+                id=str(a.get("id")),
+                filename=str(a.get("filename") or ""),
+                content_type=str(a.get("content_type") or "application/octet-stream"),
+                size=int(a.get("size") or 0),
+                uploaded_at=a.get("uploaded_at") or doc.get("updated_at") or doc.get("created_at"),
+            )
+        )
+    return SubmissionResponse.model_construct(
+        id=str(doc["_id"]),
+        task_id=str(doc["task_id"]),
+        subject_id=str(doc["subject_id"]),
+        student_uid=doc["student_uid"],
+        group_id=str(doc["group_id"]) if doc.get("group_id") is not None else None,
+        content=doc["content"],
+        submitted_at=doc["submitted_at"],
+        created_at=doc["created_at"],
+        updated_at=doc["updated_at"],
+        score=doc.get("score"),
+        feedback=doc.get("feedback"),
+        attachments=attachments,
+        evaluation=SubmissionEvaluation.model_validate(doc.get("evaluation")) if doc.get("evaluation") else None,
+    )
+
+
 async def queue_evaluation(*, submission_id: ObjectId) -> dict | None:
     submissions_collection = get_collection("submissions")
     submission = await submissions_collection.find_one({"_id": submission_id})
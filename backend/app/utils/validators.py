@@ -0,0 +1,20 @@
+from typing import Any
+
+from pydantic_core import PydanticCustomError
+
+
+def reject_oversized(value: Any, max_length: int) -> Any:
+    """Reject strings longer than ``max_length`` before field validation.
+
+    Used as a ``mode="before"`` validator on large free-text fields so an
+    oversized payload fails before any other validators run. The error has
+    the same ``string_too_long`` shape as the field's ``max_length``
+    constraint. Non-string input is passed through for normal validation.
+    """
+    if isinstance(value, str) and len(value) > max_length:
+        raise PydanticCustomError(
+            "string_too_long",
+            "String should have at most {max_length} characters",
+            {"max_length": max_length},
+        )
+    return value
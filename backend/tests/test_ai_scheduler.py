@@ -21,7 +21,7 @@ class _FakeCollection:
     def __init__(self, docs: list[dict] | None = None):
         self._docs = list(docs or [])
 
-    def find(self, query: dict):
+    def find(self, query: dict, projection: dict | None = None):
         def match(doc: dict) -> bool:
             for k, v in query.items():
                 if isinstance(v, dict) and "$in" in v:
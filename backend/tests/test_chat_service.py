@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.ai.intent_classifier import ChatIntent, _classify_cached, classify_intent
+from app.services.chat_service import ChatService, get_chat_service
+
+
+def _make_service() -> ChatService:
+    return ChatService(SimpleNamespace(ai_credits=None))
+
+
+@pytest.mark.asyncio
+async def test_gather_context_keeps_results_when_one_source_fails(monkeypatch):
+    service = _make_service()
+
+    async def fake_schedule(user_uid: str):
+        raise RuntimeError("boom")
+
+    async def fake_workload(user_uid: str):
+        return {"pending": 2, "overdue": 0, "due_soon": 1}
+
+    monkeypatch.setattr(service, "_get_schedule", fake_schedule)
+    monkeypatch.setattr(service, "_get_workload", fake_workload)
+
+    context = await service._gather_context("s1", "student", ChatIntent.SCHEDULE_HELP)
+
+    assert "schedule" not in context
+    assert context["workload"] == {"pending": 2, "overdue": 0, "due_soon": 1}
+
+
+@pytest.mark.asyncio
+async def test_teacher_context_reads_classrooms_once(monkeypatch):
+    service = _make_service()
+    overview_calls = []
+
+    async def fake_overview(teacher_uid: str, limit: int = 10):
+        overview_calls.append(teacher_uid)
+        return {
+            "subject_count": 2,
+            "task_ids": ["t1", "t2"],
+            "tasks": [{"title": "Essay", "deadline": "2026-01-01 09:00", "points": 10}],
+        }
+
+    async def fake_count_ungraded(teacher_uid, task_ids):
+        assert task_ids == ["t1", "t2"]
+        return 3
+
+    monkeypatch.setattr(service, "_get_teacher_overview", fake_overview)
+    monkeypatch.setattr(service, "_count_ungraded", fake_count_ungraded)
+
+    context = await service._gather_context("t1", "teacher", ChatIntent.SCHEDULE_HELP)
+
+    assert overview_calls == ["t1"]
+    assert context["schedule"][0]["title"] == "Essay"
+    assert context["workload"] == {"ungraded_submissions": 3, "active_classrooms": 2}
+
+
+def test_history_keeps_only_most_recent_messages():
+    service = _make_service()
+
+    for i in range(25):
+        service._add_to_history("s1", "user", f"message {i}")
+
+    history = service.get_history("s1")
+    assert len(history) == 20
+    assert history[0]["content"] == "message 5"
+    assert history[-1]["content"] == "message 24"
+
+
+def test_history_evicts_least_recently_used_session():
+    service = ChatService(SimpleNamespace(ai_credits=None), max_sessions=2)
+
+    service._add_to_history("a", "user", "hi")
+    service._add_to_history("b", "user", "hi")
+    service.get_history("a")
+    service._add_to_history("c", "user", "hi")
+
+    assert service.get_history("b") == []
+    assert len(service.get_history("a")) == 1
+    assert len(service.get_history("c")) == 1
+
+
+def test_classify_intent_memoizes_short_messages_only():
+    _classify_cached.cache_clear()
+
+    assert classify_intent("  Show Tasks ") == classify_intent("show tasks")
+    assert _classify_cached.cache_info().hits == 1
+
+    classify_intent("what tasks " * 20)
+    assert _classify_cached.cache_info().currsize == 1
+
+
+@pytest.mark.asyncio
+async def test_process_message_short_circuits_blank_input(monkeypatch):
+    service = _make_service()
+
+    async def fail_get_credits(*args, **kwargs):
+        raise AssertionError("credits should not be checked for blank input")
+
+    monkeypatch.setattr(service.credit_service, "get_credits", fail_get_credits)
+
+    result = await service.process_message(user_uid="u1", role="student", message="   \n ")
+
+    assert result["error"] == "EMPTY_MESSAGE"
+    assert service.get_history("u1") == []
+
+
+@pytest.mark.asyncio
+async def test_process_message_answers_out_of_scope_without_groq(monkeypatch):
+    service = _make_service()
+
+    async def fake_get_credits(*args, **kwargs):
+        return {"credits_remaining": 7}
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("out-of-scope messages should not gather context or spend credits")
+
+    monkeypatch.setattr(service.credit_service, "get_credits", fake_get_credits)
+    monkeypatch.setattr(service.credit_service, "use_credit", fail)
+    monkeypatch.setattr(service, "_gather_context", fail)
+
+    result = await service.process_message(user_uid="u1", role="student", message="explain photosynthesis")
+
+    assert result["intent"] == ChatIntent.OUT_OF_SCOPE.value
+    assert result["credits_remaining"] == 7
+    assert result["context_used"] == []
+
+
+def test_get_chat_service_returns_one_instance_per_database():
+    from pymongo import AsyncMongoClient
+
+    client = AsyncMongoClient("mongodb://localhost:27017", connect=False)
+
+    first = get_chat_service(client["db_a"])
+    assert get_chat_service(client["db_a"]) is first
+    assert get_chat_service(client["db_b"]) is not first
+
+
+def test_llm_history_has_only_role_and_content():
+    service = _make_service()
+
+    for i in range(6):
+        service._add_turn("s1", f"question {i}", "task_info", f"answer {i}")
+
+    llm_history = service.get_llm_history("s1")
+    assert len(llm_history) == 10
+    assert llm_history[0] == {"role": "user", "content": "question 1"}
+    assert llm_history[-1] == {"role": "assistant", "content": "answer 5"}
+    assert service.get_history("s1")[-1]["intent"] is None
+
+
+@pytest.mark.asyncio
+async def test_ungraded_count_is_cached_per_teacher(monkeypatch):
+    service = _make_service()
+    calls = []
+
+    class _FakeSubmissions:
+        async def count_documents(self, query: dict):
+            calls.append(query)
+            return 4
+
+    monkeypatch.setattr("app.services.chat_service.get_collection", lambda name: _FakeSubmissions())
+
+    assert await service._count_ungraded("t1", ["task"]) == 4
+    assert await service._count_ungraded("t1", ["task"]) == 4
+    assert len(calls) == 1
+
+    # Writing another teacher's count sweeps out the expired t1 entry
+    service._ungraded_cache["t1"] = (0.0, 4)
+    assert await service._count_ungraded("t2", ["task"]) == 4
+    assert list(service._ungraded_cache) == ["t2"]
+
+
+def test_oversized_chat_message_keeps_string_too_long_error():
+    from pydantic import ValidationError
+
+    from app.models.chat import ChatRequest
+
+    with pytest.raises(ValidationError) as exc_info:
+        ChatRequest(message="x" * 501)
+
+    (error,) = exc_info.value.errors()
+    assert error["type"] == "string_too_long"
+    assert error["ctx"] == {"max_length": 500}
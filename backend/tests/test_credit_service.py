@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import credit_service as credit_module
+from app.services.credit_service import CreditService
+
+
+class _FakeCursor:
+    def __init__(self, docs: list[dict]):
+        self._docs = docs
+
+    async def to_list(self, length=None):
+        return list(self._docs)
+
+
+class _FakeCreditsCollection:
+    def __init__(self):
+        self.docs: dict[str, dict] = {}
+        self.find_one_calls = 0
+        self.find_calls = 0
+
+    async def find_one(self, query: dict):
+        self.find_one_calls += 1
+        doc = self.docs.get(query["user_uid"])
+        return dict(doc) if doc else None
+
+    def find(self, query: dict):
+        self.find_calls += 1
+        uids = query["user_uid"]["$in"]
+        return _FakeCursor([dict(self.docs[uid]) for uid in uids if uid in self.docs])
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        uid = query["user_uid"]
+        doc = self.docs.get(uid)
+        if doc is None:
+            if not upsert:
+                return SimpleNamespace(matched_count=0, modified_count=0)
+            doc = self.docs[uid] = {"user_uid": uid, **update.get("$setOnInsert", {})}
+        doc.update(update.get("$set", {}))
+        for key, amount in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + amount
+        return SimpleNamespace(matched_count=1, modified_count=1)
+
+    async def find_one_and_update(self, query: dict, update: dict, return_document=None):
+        doc = self.docs.get(query["user_uid"])
+        if doc is None or doc.get("resets_at") is None or doc["resets_at"] <= query["resets_at"]["$gt"]:
+            return None
+        if doc.get("credits_used", 0) >= doc.get("credits_limit", 0):
+            return None
+        await self.update_one({"user_uid": doc["user_uid"]}, update)
+        return dict(doc)
+
+    async def insert_one(self, doc: dict):
+        self.docs[doc["user_uid"]] = dict(doc)
+
+
+@pytest.fixture
+def service():
+    credit_module._credit_cache.clear()
+    collection = _FakeCreditsCollection()
+    yield CreditService(SimpleNamespace(ai_credits=collection))
+    credit_module._credit_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_get_credits_served_from_cache_after_first_read(service):
+    await service.get_credits("s1", "student")
+    await service.use_credit("s1", "student")
+    status = await service.get_credits("s1", "student")
+
+    assert service.collection.find_one_calls == 1
+    assert status["credits_used"] == 1
+    assert service.collection.docs["s1"]["credits_used"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reset_credits_invalidates_cache(service):
+    await service.get_credits("s1", "student")
+    await service.use_credit("s1", "student")
+
+    await CreditService(SimpleNamespace(ai_credits=service.collection)).reset_credits("s1")
+    status = await service.get_credits("s1", "student")
+
+    assert status["credits_used"] == 0
+    assert status["credits_remaining"] == 25
+
+
+@pytest.mark.asyncio
+async def test_use_credit_stops_at_limit(service):
+    await service.get_credits("s1", "student")
+    service.collection.docs["s1"]["credits_used"] = 24
+
+    first = await service.use_credit("s1", "student")
+    second = await service.use_credit("s1", "student")
+
+    assert first["success"] is True
+    assert first["credits_remaining"] == 0
+    assert second["success"] is False
+    assert service.collection.docs["s1"]["credits_used"] == 25
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cache_misses_share_one_query(service):
+    for uid in ("a", "b"):
+        await service.get_credits(uid, "student")
+    credit_module._credit_cache.clear()
+    service.collection.find_one_calls = 0
+
+    statuses = await asyncio.gather(
+        service.get_credits("a", "student"),
+        service.get_credits("b", "student"),
+        service.get_credits("c", "student"),
+    )
+
+    assert service.collection.find_calls == 1
+    assert service.collection.find_one_calls == 0
+    assert [s["credits_remaining"] for s in statuses] == [25, 25, 25]
+    assert "c" in service.collection.docs
+
+
+@pytest.mark.asyncio
+async def test_legacy_record_without_resets_at_is_backfilled(service):
+    service.collection.docs["s1"] = {
+        "user_uid": "s1",
+        "credits_used": 3,
+        "credits_limit": 25,
+        "last_reset": datetime.utcnow(),
+    }
+
+    result = await service.use_credit("s1", "student")
+
+    assert result["success"] is True
+    assert result["credits_remaining"] == 21
+    assert service.collection.docs["s1"]["resets_at"] > datetime.utcnow()
+    assert service.collection.docs["s1"]["credits_used"] == 4
+
+
+@pytest.mark.asyncio
+async def test_exhausted_or_expired_cache_entries_are_reread(service):
+    await service.get_credits("s1", "student")
+    service.collection.docs["s1"]["credits_used"] = 25
+    credit_module._credit_cache["s1"]["credits_used"] = 25
+
+    # Another worker resets the record; an exhausted entry is never trusted
+    service.collection.docs["s1"]["credits_used"] = 0
+    status = await service.get_credits("s1", "student")
+    assert status["credits_remaining"] == 25
+
+    # Another worker spends credits; the stale entry lapses after its TTL
+    service.collection.docs["s1"]["credits_used"] = 25
+    credit_module._credit_cache["s1"]["expires_at"] = 0.0
+    status = await service.get_credits("s1", "student")
+    assert status["credits_remaining"] == 0
@@ -62,6 +62,23 @@ class _FakeCollection:
     async def count_documents(self, query: dict):
         return sum(1 for d in self._docs if self._matches(d, query))
 
+    def _run_pipeline(self, docs: list[dict], pipeline: list[dict]) -> list[dict]:
+        for stage in pipeline:
+            if "$match" in stage:
+                docs = [d for d in docs if self._matches(d, stage["$match"])]
+            elif "$count" in stage:
+                docs = [{stage["$count"]: len(docs)}] if docs else []
+            elif "$facet" in stage:
+                docs = [
+                    {name: self._run_pipeline(docs, sub) for name, sub in stage["$facet"].items()}
+                ]
+            else:
+                raise AssertionError(f"Unsupported stage: {stage}")
+        return docs
+
+    async def aggregate(self, pipeline: list[dict]):
+        return _FakeCursor(self._run_pipeline(list(self._docs), pipeline))
+
 
 @pytest.mark.asyncio
 async def test_due_soon_excludes_submitted_tasks(monkeypatch):
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.services import extension_service as extension_module
+from app.services.extension_service import ExtensionService
+
+
+class _FakeCursor:
+    def __init__(self, docs: list[dict]):
+        self._docs = docs
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, *args, **kwargs):
+        return self
+
+    async def to_list(self, length=None):
+        return list(self._docs)
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, cond in query.items():
+        if isinstance(cond, dict) and "$in" in cond:
+            if doc.get(key) not in cond["$in"]:
+                return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class _FakeCollection:
+    def __init__(self, docs: list[dict] | None = None):
+        self.docs = docs or []
+        self.queries = 0
+
+    def find(self, query: dict, projection: dict | None = None):
+        self.queries += 1
+        return _FakeCursor([d for d in self.docs if _matches(d, query)])
+
+    async def find_one(self, query: dict, projection: dict | None = None):
+        self.queries += 1
+        return next((d for d in self.docs if _matches(d, query)), None)
+
+
+def _make_service(n: int):
+    subject_id = ObjectId()
+    tasks = [{"_id": ObjectId(), "title": f"Task {i}", "subject_id": subject_id} for i in range(n)]
+    now = datetime.utcnow()
+    extensions = [
+        {
+            "_id": ObjectId(),
+            "student_uid": f"s{i}",
+            "task_id": tasks[i]["_id"],
+            "subject_id": str(subject_id),
+            "current_deadline": now,
+            "requested_deadline": now + timedelta(days=2),
+            "extension_days": 2,
+            "reason": "Family emergency this week",
+            "status": "pending",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(n)
+    ]
+    db = SimpleNamespace(
+        extensions=_FakeCollection(extensions),
+        tasks=_FakeCollection(tasks),
+        submissions=_FakeCollection(),
+        subjects=_FakeCollection([{"_id": subject_id, "name": "Physics", "teacher_uid": "t1"}]),
+        users=_FakeCollection([{"uid": f"s{i}", "display_name": f"Student {i}"} for i in range(n)]),
+    )
+    return ExtensionService(db), db
+
+
+@pytest.mark.asyncio
+async def test_get_extension_requests_enriches_in_batches():
+    service, db = _make_service(5)
+
+    results = await service.get_extension_requests()
+
+    assert len(results) == 5
+    assert {r.task_title for r in results} == {f"Task {i}" for i in range(5)}
+    assert {r.subject_name for r in results} == {"Physics"}
+    assert results[0].student_name == "Student 0"
+    # One batched query per related collection, independent of page size
+    assert (db.tasks.queries, db.subjects.queries, db.users.queries) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_teacher_subject_ids_cached_until_invalidated():
+    extension_module._teacher_subjects_cache.clear()
+    service, db = _make_service(2)
+
+    await service.get_extension_requests(teacher_uid="t1")
+    results = await service.get_extension_requests(teacher_uid="t1", status="pending")
+    assert len(results) == 2
+    # The second call reuses the cached subject ids; only enrichment hit subjects
+    assert db.subjects.queries == 3
+
+    extension_module.invalidate_teacher_subjects("t1")
+    await service.get_extension_requests(teacher_uid="t1")
+    assert db.subjects.queries == 5
+    extension_module._teacher_subjects_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_teacher_subject_cache_drops_expired_entries():
+    extension_module._teacher_subjects_cache.clear()
+    extension_module._teacher_subjects_cache["gone"] = (0.0, ["stale"])
+    service, _ = _make_service(1)
+
+    await service.get_extension_requests(teacher_uid="t1")
+
+    assert list(extension_module._teacher_subjects_cache) == ["t1"]
+    extension_module._teacher_subjects_cache.clear()
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from app.services.groq_service import FairConcurrencyLimiter, GroqService, InMemoryCache, RateLimiter
+
+
+def test_cache_clear_expired_keeps_live_entries():
+    cache = InMemoryCache()
+    cache.set("a", "1", ttl_seconds=0)
+    cache.set("b", "2", ttl_seconds=3600)
+
+    cache.clear_expired()
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "2"
+
+
+def test_cache_overwrite_is_not_evicted_by_stale_expiry():
+    cache = InMemoryCache()
+    cache.set("a", "old", ttl_seconds=0)
+    cache.set("a", "new", ttl_seconds=3600)
+
+    cache.clear_expired()
+
+    assert cache.get("a") == "new"
+
+
+def test_cache_heap_compacts_after_many_overwrites():
+    cache = InMemoryCache()
+    for i in range(100):
+        cache.set("a", str(i), ttl_seconds=3600)
+
+    assert cache.get("a") == "99"
+    assert len(cache._expiry_heap) <= 2
+
+
+def test_rate_limiter_blocks_at_capacity_and_refills():
+    limiter = RateLimiter()
+    limiter.limits["chat"] = {"max": 2, "window": 3600}
+
+    assert limiter.try_acquire("u1", "chat")
+    assert limiter.try_acquire("u1", "chat")
+    assert not limiter.try_acquire("u1", "chat")
+    assert limiter.try_acquire("u2", "chat")
+
+    # Half a window later one call's worth of tokens is back
+    limiter._usage["u1"]["chat"]["last_refill"] -= 1800
+    assert limiter.try_acquire("u1", "chat")
+    assert not limiter.try_acquire("u1", "chat")
+
+    # A released call can be taken again, but never beyond capacity
+    limiter.release("u1", "chat")
+    assert limiter.try_acquire("u1", "chat")
+    for _ in range(5):
+        limiter.release("u2", "chat")
+    assert limiter._usage["u2"]["chat"]["tokens"] == 2.0
+
+
+@pytest.mark.asyncio
+async def test_fair_limiter_rotates_between_waiting_users():
+    limiter = FairConcurrencyLimiter(1)
+    order: list[str] = []
+    release_first = asyncio.Event()
+
+    async def call(user: str, label: str, hold: asyncio.Event | None = None):
+        async with limiter.slot(user):
+            order.append(label)
+            if hold is not None:
+                await hold.wait()
+
+    first = asyncio.create_task(call("heavy", "heavy-1", release_first))
+    await asyncio.sleep(0)
+    waiting = [
+        asyncio.create_task(call("heavy", "heavy-2")),
+        asyncio.create_task(call("heavy", "heavy-3")),
+        asyncio.create_task(call("light", "light-1")),
+    ]
+    await asyncio.sleep(0)
+    release_first.set()
+    await asyncio.gather(first, *waiting)
+
+    assert order == ["heavy-1", "heavy-2", "light-1", "heavy-3"]
+
+
+def test_cache_evicts_least_recently_used_past_capacity():
+    cache = InMemoryCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+@pytest.mark.asyncio
+async def test_safe_call_serves_fallback_while_breaker_is_open(monkeypatch):
+    service = GroqService()
+
+    class _FailingClient:
+        class chat:
+            class completions:
+                @staticmethod
+                async def create(**kwargs):
+                    raise AssertionError("Groq should not be called while the breaker is open")
+
+    monkeypatch.setattr(service, "client", _FailingClient())
+    monkeypatch.setattr(service, "_breaker_open_until", 0.0)
+    service._open_breaker()
+
+    result = await service.safe_call("chat", "u1", "hello", fallback={"ok": False}, use_cache=False)
+
+    assert json.loads(result) == {"ok": False}
+
+
+@pytest.mark.asyncio
+async def test_code_feedback_accepts_non_string_test_fields(monkeypatch):
+    service = GroqService()
+    monkeypatch.setattr(service, "client", None)
+    monkeypatch.setattr(service, "grading_client", None)
+
+    feedback = await service.generate_code_feedback(
+        user_uid="u1",
+        code="print(1)",
+        language="python",
+        test_results=[{"passed": False, "input": None, "expected": 42, "actual": "1"}],
+        task_description="Print the answer",
+    )
+
+    assert feedback.startswith("Passed 0/1 test cases.")
+
+
+@pytest.mark.asyncio
+async def test_safe_call_refunds_rate_limit_when_groq_fails(monkeypatch):
+    service = GroqService()
+
+    class _BrokenClient:
+        class chat:
+            class completions:
+                @staticmethod
+                async def create(**kwargs):
+                    raise ValueError("malformed response")
+
+    monkeypatch.setattr(service, "client", _BrokenClient())
+    monkeypatch.setattr(service, "_breaker_open_until", 0.0)
+    monkeypatch.setattr(service, "rate_limiter", RateLimiter())
+    service.rate_limiter.limits["chat"] = {"max": 1, "window": 3600}
+
+    result = await service.safe_call("chat", "u1", "hello", fallback="offline", use_cache=False)
+
+    assert result == "offline"
+    assert service.rate_limiter.try_acquire("u1", "chat")
+
+
+@pytest.mark.asyncio
+async def test_safe_call_refunds_rate_limit_when_cancelled(monkeypatch):
+    service = GroqService()
+    started = asyncio.Event()
+
+    class _SlowClient:
+        class chat:
+            class completions:
+                @staticmethod
+                async def create(**kwargs):
+                    started.set()
+                    await asyncio.sleep(3600)
+
+    monkeypatch.setattr(service, "client", _SlowClient())
+    monkeypatch.setattr(service, "_breaker_open_until", 0.0)
+    monkeypatch.setattr(service, "rate_limiter", RateLimiter())
+    service.rate_limiter.limits["chat"] = {"max": 1, "window": 3600}
+
+    call = asyncio.create_task(service.safe_call("chat", "u1", "hello", fallback="offline", use_cache=False))
+    await started.wait()
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+
+    assert service.rate_limiter.try_acquire("u1", "chat")